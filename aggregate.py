@@ -0,0 +1,70 @@
+"""
+Fused aggregation over raw transaction rows.
+
+The sidebar Quick Stats, calculate_kpis and get_insights all need the same
+handful of statistics. Instead of a dozen separate pandas reductions and a
+groupby, the numeric columns are copied once into a single contiguous
+block and every statistic is reduced from that block, with per-station
+totals taken from one bincount.
+"""
+
+import numpy as np
+import pandas as pd
+from rollup import MEASURES
+
+def fused_summary(df):
+    """Return the summary dict (see datasets.summarise) computed from df's rows."""
+    measures = [column for column in MEASURES if column in df.columns]
+    summary = {'rows': len(df)}
+
+    if measures:
+        # One contiguous row per measure keeps every reduction a linear scan
+        block = np.empty((len(measures), len(df)), dtype=np.float64)
+        for position, column in enumerate(measures):
+            block[position] = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+        missing = np.isnan(block)
+        counts = len(df) - missing.sum(axis=1)
+        minimums = np.full(len(measures), np.nan)
+        maximums = np.full(len(measures), np.nan)
+        first = np.zeros(len(measures))
+        if counts.any():
+            minimums = np.fmin.reduce(block, axis=1)
+            maximums = np.fmax.reduce(block, axis=1)
+            # Shift by the first value of each column so the sum of squares stays well conditioned
+            first = np.where(counts > 0, block[np.arange(len(measures)), missing.argmin(axis=1)], 0.0)
+        block -= first[:, None]
+        np.copyto(block, 0.0, where=missing)
+        shifted_sums = block.sum(axis=1)
+        shifted_squares = np.einsum('ij,ij->i', block, block)
+
+        for position, column in enumerate(measures):
+            count = int(counts[position])
+            total = shifted_sums[position] + count * first[position]
+            stats = {'sum': total, 'count': count, 'mean': np.nan, 'std': np.nan,
+                     'min': minimums[position], 'max': maximums[position]}
+            if count > 0:
+                stats['mean'] = total / count
+            if count > 1:
+                variance = (shifted_squares[position] - shifted_sums[position] ** 2 / count) / (count - 1)
+                stats['std'] = float(np.sqrt(max(variance, 0.0)))
+            summary[column] = stats
+
+    if 'date' in df.columns:
+        dates = df['date'].to_numpy(dtype='datetime64[ns]')
+        present = dates[~np.isnat(dates)]
+        summary['date_min'] = pd.Timestamp(present.min()) if len(present) else pd.NaT
+        summary['date_max'] = pd.Timestamp(present.max()) if len(present) else pd.NaT
+
+    if 'station' in df.columns and 'price' in measures:
+        codes, stations = pd.factorize(df['station'], sort=True)
+        # block now holds shifted prices with missing values zeroed, so undo the shift per row
+        position = measures.index('price')
+        weights = block[position] + np.where(missing[position], 0.0, first[position])
+        keep = codes >= 0
+        if not keep.all():
+            codes, weights = codes[keep], weights[keep]
+        totals = np.bincount(codes, weights=weights, minlength=len(stations))
+        summary['by_station'] = pd.Series(totals, index=pd.Index(stations, name='station'), name='price')
+
+    return summary
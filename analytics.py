@@ -0,0 +1,395 @@
+"""
+Streamlit-free analytics core: loading, filtering, KPIs, insights and forecasts.
+
+Everything here runs in plain Python, so the same code serves the dashboard
+(through the caching wrapper in data_loader), the batch report CLI and the
+benchmarks. Errors are raised, not rendered; callers decide how to show them.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from config import DATA_CONFIG
+from data_cache import read_snapshot, load_snapshot, write_snapshot, source_fingerprint
+from excel_reader import read_workbook, normalise_column, RowChecksum
+from datasets import get_dataset, is_full_frame, stamp_view, clear_view, summarise
+from filter_index import DATE_KEYS
+from memo import get_cache, memoize
+# plain_value is re-exported for the batch report and benchmarks
+from store import TransactionStore, plain_value
+from forecast import forecast_series, linear_forecast
+from timeseries import resample
+from validation import NUMERIC_COLUMNS, parse_error_bits, validate
+
+def prepare_data(df):
+    """Normalise column names, coerce types and add derived calendar and cost columns.
+    
+    Unparseable dates and numbers become NaT/NaN; the columns they came from
+    are recorded in the 'parse_errors' bitmask for validation.validate.
+    """
+    df.columns = df.columns.str.strip().str.lower().str.replace(' ', '_')
+    # The streaming reader has already coerced its typed columns and recorded their failures
+    parse_errors = (df['parse_errors'].to_numpy(dtype=np.uint8, copy=True) if 'parse_errors' in df.columns
+                    else np.zeros(len(df), dtype=np.uint8))
+    
+    if 'date' in df.columns:
+        raw = df['date']
+        df['date'] = pd.to_datetime(raw, errors='coerce')
+        parse_errors |= parse_error_bits(raw, df['date'], 'date')
+        df['year'] = df['date'].dt.year
+        # month_name() is vectorised; strftime('%B') formats row by row
+        df['month_name'] = df['date'].dt.month_name()
+        df['month_num'] = df['date'].dt.month
+        df['quarter'] = df['date'].dt.quarter
+    
+    for column in NUMERIC_COLUMNS:
+        if column in df.columns and not pd.api.types.is_numeric_dtype(df[column]):
+            raw = df[column]
+            df[column] = pd.to_numeric(raw, errors='coerce')
+            parse_errors |= parse_error_bits(raw, df[column], column)
+    df['parse_errors'] = parse_errors
+    
+    # Calculate additional metrics; zero or missing litres leave the cost undefined rather than inf
+    if 'price' in df.columns and 'litres' in df.columns:
+        litres = df['litres'].to_numpy(dtype=np.float64, na_value=np.nan)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            df['cost_per_litre'] = np.where(litres > 0, df['price'].to_numpy(dtype=np.float64, na_value=np.nan) / litres, np.nan)
+    
+    return df
+
+CATEGORY_COLUMNS = ['station', 'month_name', 'attendant', 'vehicle']
+CALENDAR_COLUMNS = {'year': 'int16', 'month_num': 'int8', 'quarter': 'int8'}
+FLOAT_COLUMNS = ['price', 'litres', 'liter_price', 'cost_per_litre']
+
+def compact_frame(df, tolerance=DATA_CONFIG['float32_tolerance']):
+    """Narrow column dtypes to cut the in-memory size of a prepared frame.
+    
+    Text columns become categoricals and calendar fields small integers
+    (nullable when some dates are missing). Float columns drop to float32
+    only if no value moves by more than tolerance.
+    """
+    df = df.copy()
+    
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype('category')
+    
+    for column, dtype in CALENDAR_COLUMNS.items():
+        if column in df.columns:
+            df[column] = df[column].astype(dtype if df[column].notna().all() else dtype.capitalize())
+    
+    for column in FLOAT_COLUMNS:
+        if column in df.columns and df[column].dtype == np.float64:
+            narrowed = df[column].astype(np.float32)
+            error = np.abs(narrowed.to_numpy(np.float64) - df[column].to_numpy())
+            finite = np.isfinite(error)
+            if not finite.any() or error[finite].max() <= tolerance:
+                df[column] = narrowed
+    
+    return df
+
+def memory_report(before, after):
+    """Per-column memory usage of two versions of a frame, in bytes."""
+    report = pd.DataFrame({
+        'dtype_before': before.dtypes.astype(str),
+        'bytes_before': before.memory_usage(index=False, deep=True),
+        'dtype_after': after.dtypes.astype(str),
+        'bytes_after': after.memory_usage(index=False, deep=True)
+    })
+    report.loc['total'] = ['', report['bytes_before'].sum(), '', report['bytes_after'].sum()]
+    report['saving_pct'] = (1 - report['bytes_after'] / report['bytes_before']) * 100
+    return report
+
+def _streamable(path):
+    return DATA_CONFIG['streaming'] and str(path).lower().endswith(('.xlsx', '.xlsm'))
+
+def read_source(path, sheets=DATA_CONFIG['sheets'], **stream_options):
+    """Read the raw workbook, streaming it in row batches where openpyxl can."""
+    if _streamable(path):
+        return read_workbook(path, sheets=sheets, batch_size=DATA_CONFIG['batch_size'], **stream_options)
+    
+    frames = pd.read_excel(path, sheet_name=None if sheets == 'all' else (sheets or 0))
+    if isinstance(frames, dict):
+        return pd.concat([frame.rename(columns=normalise_column) for frame in frames.values()], ignore_index=True)
+    return frames
+
+def _record_watermark(fingerprint, df, checksum):
+    """Store the row count, row checksum and last date a snapshot was built from."""
+    fingerprint['rows'] = checksum.rows
+    fingerprint['row_hash'] = checksum.finish()
+    last_date = df['date'].max() if 'date' in df.columns and len(df) else None
+    fingerprint['last_date'] = None if pd.isna(last_date) else last_date.isoformat()
+
+def append_new_rows(path, fingerprint):
+    """Extend the last snapshot with rows appended to the workbook since it was built.
+    
+    Returns None when a full rebuild is needed: no usable watermark, or the
+    rows already ingested no longer match the start of the workbook.
+    """
+    cached, meta = load_snapshot(path)
+    if cached is None or not meta.get('row_hash') or not _streamable(path):
+        return None
+    
+    checksum = RowChecksum(boundary=meta['rows'])
+    tail = read_source(path, skip_rows=meta['rows'], checksum=checksum)
+    checksum.finish()
+    if checksum.prefix != meta['row_hash']:
+        return None
+    
+    df = pd.concat([cached, prepare_data(tail)], ignore_index=True) if len(tail) else cached
+    _record_watermark(fingerprint, df, checksum)
+    return df
+
+def read_petrol_data(path=DATA_CONFIG['source_file'], use_snapshot=DATA_CONFIG['snapshot_enabled']):
+    """Read and prepare a workbook, reusing its columnar snapshot while it is valid.
+    
+    A stale snapshot is first extended with any appended rows; only when the
+    existing rows changed is the whole workbook parsed again.
+    """
+    if not use_snapshot:
+        return prepare_data(read_source(path))
+    
+    df = read_snapshot(path)
+    if df is not None:
+        return df
+    
+    fingerprint = source_fingerprint(path)
+    if DATA_CONFIG['incremental']:
+        df = append_new_rows(path, fingerprint)
+    
+    if df is None:
+        if _streamable(path):
+            checksum = RowChecksum()
+            df = prepare_data(read_source(path, checksum=checksum))
+            _record_watermark(fingerprint, df, checksum)
+        else:
+            df = prepare_data(read_source(path))
+    
+    write_snapshot(df, path, fingerprint)
+    return df
+
+def source_version(path=DATA_CONFIG['source_file']):
+    """Cheap (size, mtime) token that changes whenever the workbook is saved."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+def sort_by_date(df):
+    """df in date order (undated rows last) with a fresh RangeIndex, so date ranges are slices."""
+    if 'date' not in df.columns or df['date'].is_monotonic_increasing:
+        return df
+    return df.sort_values('date', kind='stable', na_position='last', ignore_index=True)
+
+def load_dataset(path=DATA_CONFIG['source_file'], compact=DATA_CONFIG['compact_dtypes']):
+    """Read, prepare and validate a source file, narrowing its dtypes when compact is set.
+    
+    Returns (clean rows in date order, quarantined rows); see validation.validate.
+    Rows are validated before sorting, so the quarantine's 'row' is the
+    position in the source.
+    """
+    df, quarantine = validate(read_petrol_data(path))
+    df = sort_by_date(df)
+    return (compact_frame(df) if compact else df), quarantine
+
+def _filter_criteria(df, year=None, month=None, station=None, vehicle=None, date_range=None):
+    """Translate sidebar selections into column=value criteria.
+    
+    date_range is a (start, end) pair of dates, both inclusive and either
+    None; it becomes ISO 'date_from'/'date_to' criteria.
+    """
+    criteria = {}
+    if date_range and 'date' in df.columns:
+        for key, bound in zip(DATE_KEYS, date_range):
+            if bound is not None:
+                criteria[key] = pd.Timestamp(bound).date().isoformat()
+    if year and 'year' in df.columns:
+        criteria['year'] = year
+    if month and month != 'All Months' and 'month_name' in df.columns:
+        criteria['month_name'] = month
+    if station and station != 'All Stations' and 'station' in df.columns:
+        criteria['station'] = station
+    if vehicle and vehicle != 'All Vehicles' and 'vehicle' in df.columns:
+        criteria['vehicle'] = vehicle
+    return criteria
+
+def filter_data(df, year=None, month=None, station=None, vehicle=None, date_range=None):
+    """Apply filters to the dataset.
+    
+    Frames stamped by load_petrol_data are filtered through their precomputed
+    index and the result is stamped as a view, so aggregates over it can be
+    served from the rollup cube. With no active filter the frame itself is
+    returned, not a copy.
+    
+    df may also be a TransactionStore, in which case only the matching rows
+    are read from SQLite (and kept in the bounded 'store' cache).
+    """
+    criteria = _filter_criteria(df, year, month, station, vehicle, date_range)
+    
+    if isinstance(df, TransactionStore):
+        cache = get_cache('store')
+        key = (df.path, df.version, tuple(sorted(criteria.items())))
+        rows = cache.get(key)
+        if rows is None:
+            rows = df.rows(criteria)
+            cache.put(key, rows)
+        return rows
+    dataset = is_full_frame(df)
+    
+    if dataset is not None:
+        positions = dataset.index.positions(**criteria)
+        if positions is None:
+            return df
+        # A bare date range on the date-sorted frame is a slice, which pandas does not copy
+        view = df.iloc[positions] if isinstance(positions, slice) else df.take(positions)
+        return stamp_view(view, dataset, criteria)
+    
+    filtered_df = df.copy()
+    for column, value in criteria.items():
+        if column == 'date_from':
+            filtered_df = filtered_df[filtered_df['date'] >= pd.Timestamp(value)]
+        elif column == 'date_to':
+            filtered_df = filtered_df[filtered_df['date'] < pd.Timestamp(value) + pd.Timedelta(days=1)]
+        else:
+            filtered_df = filtered_df[filtered_df[column] == value]
+    
+    return clear_view(filtered_df)
+
+def filter_values(df, column, year=None):
+    """Distinct values of a sidebar filter column (months in calendar order), optionally within year."""
+    if isinstance(df, TransactionStore):
+        return df.distinct(column, {'year': year} if year is not None else None)
+    if year is not None:
+        df = filter_data(df, year)
+    if column == 'month_name':
+        return list(df.sort_values('month_num')['month_name'].unique())
+    return sorted(df[column].dropna().unique())
+
+def load_rejections(df):
+    """Rows validation rejected while a loaded frame or store was built.
+    
+    Returns (quarantine, rows read), where rows read counts clean and
+    rejected rows together.
+    """
+    if isinstance(df, TransactionStore):
+        quarantine = df.quarantine()
+        return quarantine, df.row_count + len(quarantine)
+    dataset = get_dataset(df)
+    if dataset is None or dataset.quarantine is None:
+        return pd.DataFrame(), len(df)
+    return dataset.quarantine, dataset.n_rows + len(dataset.quarantine)
+
+def date_extent(df):
+    """(first, last) transaction date of a frame or store, NaT when undated."""
+    if isinstance(df, TransactionStore):
+        return df.date_extent()
+    summary = summarise(df)
+    return summary.get('date_min', pd.NaT), summary.get('date_max', pd.NaT)
+
+@memoize('analytics')
+def calculate_kpis(df):
+    """Calculate key performance indicators."""
+    kpis = {}
+    
+    if not df.empty:
+        summary = summarise(df)
+        kpis['total_spent'] = summary['price']['sum'] if 'price' in summary else 0
+        kpis['total_litres'] = summary['litres']['sum'] if 'litres' in summary else 0
+        kpis['avg_price_per_litre'] = summary['liter_price']['mean'] if 'liter_price' in summary else 0
+        kpis['total_visits'] = summary['rows']
+        kpis['avg_spend_per_visit'] = kpis['total_spent'] / kpis['total_visits'] if kpis['total_visits'] > 0 else 0
+        
+        # Monthly averages
+        if 'date_min' in summary:
+            months_span = (summary['date_max'] - summary['date_min']).days / 30.44
+            kpis['monthly_spend'] = kpis['total_spent'] / months_span if months_span > 0 else 0
+            kpis['monthly_visits'] = kpis['total_visits'] / months_span if months_span > 0 else 0
+    
+    return kpis
+
+@memoize('analytics')
+def generate_predictions(df, days_ahead=30):
+    """Generate spending predictions from a closed-form linear trend."""
+    if df.empty or 'date' not in df.columns or 'price' not in df.columns or len(df) < 3:
+        return pd.DataFrame()
+    
+    try:
+        df_pred = df.dropna(subset=['date', 'price'])
+        if len(df_pred) < 3:
+            return pd.DataFrame()
+        
+        return linear_forecast(df_pred['date'], df_pred['price'], days_ahead)
+    except Exception:
+        return pd.DataFrame()
+
+@memoize('analytics')
+def group_forecasts(df, by='station'):
+    """Per-period spend forecasts and backtest accuracy for every group of df[by].
+    
+    Returns (forecasts, accuracy) as forecast.forecast_series, or two empty
+    frames when df has no such column.
+    """
+    if df.empty or by not in df.columns or 'date' not in df.columns or 'price' not in df.columns:
+        return pd.DataFrame(), pd.DataFrame()
+    return forecast_series(df, by)
+
+def model_accuracy(accuracy):
+    """Backtest accuracy per model across groups: MAE pooled over scored periods, mean MAPE."""
+    if accuracy.empty:
+        return pd.DataFrame(columns=['mae', 'mape', 'series'])
+    scored = accuracy[accuracy['points'] > 0]
+    weighted = scored.assign(error=scored['mae'] * scored['points']).groupby('model', sort=False)
+    return pd.DataFrame({
+        'mae': weighted['error'].sum() / weighted['points'].sum(),
+        'mape': weighted['mape'].mean(),
+        'series': weighted.size()
+    })
+
+@memoize('analytics')
+def get_insights(df):
+    """Generate business insights from the data."""
+    insights = []
+    
+    if df.empty:
+        return insights
+    
+    summary = summarise(df)
+    
+    # Station analysis
+    if 'by_station' in summary and len(summary['by_station']):
+        station_spending = summary['by_station'].sort_values(ascending=False)
+        top_station = station_spending.index[0]
+        top_station_pct = (station_spending.iloc[0] / station_spending.sum()) * 100
+        insights.append(f"🏆 Primary Station: {top_station} ({top_station_pct:.1f}% of total spend)")
+    
+    # Price trends
+    if 'liter_price' in summary:
+        avg_price = summary['liter_price']['mean']
+        price_volatility = summary['liter_price']['std']
+        insights.append(f"⛽ Average Fuel Price: R{avg_price:.2f}/L (±R{price_volatility:.2f})")
+    
+    # Recent price momentum from the weekly series
+    if 'liter_price' in summary and 'date_min' in summary:
+        weekly = resample(df, 'weekly').dropna(subset=['price'])
+        if len(weekly) > 1:
+            latest = weekly.iloc[-1]
+            change = (latest['price_ewma'] / latest['price_rolling'] - 1) * 100
+            insights.append(
+                f"📈 Price Momentum: R{latest['price_ewma']:.2f}/L weekly EWMA vs R{latest['price_rolling']:.2f}/L "
+                f"rolling average ({change:+.1f}%), recent volatility ±R{latest['price_volatility']:.2f}"
+            )
+    
+    # Consumption patterns
+    if 'litres' in summary:
+        avg_litres = summary['litres']['mean']
+        total_litres = summary['litres']['sum']
+        insights.append(f"📊 Consumption: {total_litres:.0f}L total, {avg_litres:.1f}L average per visit")
+    
+    # Frequency analysis
+    if 'date_min' in summary and summary['rows'] > 1:
+        date_range = (summary['date_max'] - summary['date_min']).days
+        frequency = summary['rows'] / (date_range / 7) if date_range > 0 else 0
+        insights.append(f"📅 Visit Frequency: {frequency:.1f} times per week")
+    
+    return insights
\ No newline at end of file
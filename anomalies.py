@@ -0,0 +1,163 @@
+"""
+Vectorised anomaly scoring for suspicious transactions.
+
+Every row is scored in one pass over a (group, date) ordering of the frame:
+
+- liter_price gets a rolling robust z-score within its station, and litres
+  within its vehicle (or the whole frame outside fleet mode), where only
+  unusually large fills count since top-ups are normal. The centre is
+  the rolling median and the scale the rolling interquartile range / 1.349,
+  both over the trailing window, so one bad fill cannot mask itself.
+- litres outside (0, max_tank_litres] and a price that disagrees with
+  litres * liter_price are flagged outright.
+- A near-duplicate is a row whose station and day match an earlier-arriving
+  row with a price within duplicate_price_tolerance.
+
+Windows only look backwards, so StreamingDetector can score appended rows
+from the tail of each group alone and get the same result a full rescore
+would give.
+"""
+
+import numpy as np
+import pandas as pd
+from config import ANOMALY_CONFIG
+from memo import memoize
+
+FLAG_LABELS = {
+    'price_outlier': 'unusual price/L for station',
+    'litres_outlier': 'unusual volume',
+    'litres_range': 'implausible litres',
+    'price_mismatch': 'price ≠ litres × price/L',
+    'duplicate': 'possible duplicate swipe'
+}
+
+def _group_codes(df, column):
+    """Integer group per row (missing values share one group); all zeros if column is absent."""
+    if column is None or column not in df.columns:
+        return np.zeros(len(df), dtype=np.intp)
+    codes, _ = pd.factorize(df[column], use_na_sentinel=False)
+    return codes
+
+def rolling_robust_z(values, codes, dates, window, min_periods, min_relative_scale):
+    """Trailing rolling robust z-score of values within each group code, in row order.
+
+    The scale is floored at min_relative_scale times the rolling median.
+    """
+    order = np.lexsort((dates, codes))
+    ordered = pd.Series(values[order])
+    rolling = ordered.groupby(codes[order], sort=False).rolling(window, min_periods=min_periods)
+    # groupby().rolling() lists rows group by group, which is already the lexsort order
+    median = rolling.median().to_numpy()
+    spread = (rolling.quantile(0.75).to_numpy() - rolling.quantile(0.25).to_numpy()) / 1.349
+    with np.errstate(invalid='ignore'):
+        z = (ordered.to_numpy() - median) / np.fmax(spread, min_relative_scale * np.abs(median))
+    result = np.empty(len(values))
+    result[order] = z
+    return result
+
+def near_duplicates(codes, days, prices, tolerance):
+    """Rows whose group and day match an earlier row with a price within tolerance."""
+    arrival = np.arange(len(prices))
+    order = np.lexsort((arrival, prices, days, codes))
+    close = (
+        (codes[order][1:] == codes[order][:-1])
+        & (days[order][1:] == days[order][:-1])
+        & (np.abs(np.diff(prices[order])) <= tolerance)
+    )
+    # Of each close pair, the row that arrived later is the suspected repeat
+    later = np.where(arrival[order][1:] > arrival[order][:-1], order[1:], order[:-1])
+    flags = np.zeros(len(prices), dtype=bool)
+    flags[later[close]] = True
+    return flags
+
+def score_frame(df, config=ANOMALY_CONFIG):
+    """Per-row z-scores, flags, overall score and reasons, indexed like df."""
+    n_rows = len(df)
+    dates = df['date'].to_numpy(dtype='datetime64[ns]').view(np.int64) if 'date' in df.columns else np.zeros(n_rows, dtype=np.int64)
+    scores = pd.DataFrame(index=df.index)
+
+    def column(name):
+        return df[name].to_numpy(dtype=np.float64, na_value=np.nan) if name in df.columns else np.full(n_rows, np.nan)
+
+    liter_price, litres, price = column('liter_price'), column('litres'), column('price')
+    window, min_periods = config['window'], config['min_periods']
+
+    scores['price_z'] = rolling_robust_z(liter_price, _group_codes(df, 'station'), dates, window, min_periods,
+                                         config['min_relative_scale']['liter_price'])
+    scores['litres_z'] = rolling_robust_z(litres, _group_codes(df, 'vehicle'), dates, window, min_periods,
+                                          config['min_relative_scale']['litres'])
+
+    threshold = config['z_threshold']
+    with np.errstate(invalid='ignore'):
+        scores['price_outlier'] = np.abs(scores['price_z'].to_numpy()) > threshold
+        # Small top-ups are normal; only unusually large fills are suspicious
+        scores['litres_outlier'] = scores['litres_z'].to_numpy() > threshold
+        scores['litres_range'] = (litres <= 0) | (litres > config['max_tank_litres'])
+        expected = litres * liter_price
+        scores['price_mismatch'] = np.abs(price - expected) > config['price_tolerance'] * np.fmax(np.abs(price), 1.0)
+
+    dated = ~np.isnat(dates.view('datetime64[ns]'))
+    days = np.where(dated, dates // 86_400_000_000_000, np.iinfo(np.int64).min)
+    duplicates = near_duplicates(_group_codes(df, 'station'), days, np.nan_to_num(price, nan=np.inf),
+                                 config['duplicate_price_tolerance'])
+    scores['duplicate'] = duplicates & dated & ~np.isnan(price)
+
+    flags = scores[list(FLAG_LABELS)]
+    scores['score'] = np.fmax(np.abs(scores['price_z']), scores['litres_z'].clip(lower=0)).fillna(0.0)
+    scores['flagged'] = flags.any(axis=1)
+    scores['reasons'] = flags.dot(pd.Index([label + '; ' for label in FLAG_LABELS.values()])).str.rstrip('; ')
+    return scores
+
+@memoize('analytics')
+def score_transactions(df):
+    """Anomaly scores for every row of df (see score_frame)."""
+    return score_frame(df)
+
+def flagged_transactions(df, scores=None, limit=None):
+    """Flagged rows of df with their reasons and score, most anomalous first.
+
+    scores may be the result of score_transactions on a larger frame df was
+    filtered from (same row labels), so views are judged against the full
+    history rather than only the rows they contain.
+    """
+    scores = score_transactions(df) if scores is None else scores.loc[df.index]
+    flagged = scores[scores['flagged']]
+    columns = [column for column in ('date', 'station', 'vehicle', 'price', 'litres', 'liter_price') if column in df.columns]
+    result = df.loc[flagged.index, columns].assign(reasons=flagged['reasons'], score=flagged['score'].round(2))
+    result = result.sort_values(['score', 'date'] if 'date' in columns else 'score', ascending=False)
+    return result.head(limit) if limit else result
+
+class StreamingDetector:
+    """Scores appended rows against the trailing context of earlier ones.
+
+    Only the last window rows of each station and vehicle group (and the
+    latest day per station, for duplicates) are kept between updates, so an
+    update costs the size of the batch, not of the history. Rows must arrive
+    in date order for the scores to equal a full rescore.
+    """
+
+    def __init__(self, config=ANOMALY_CONFIG):
+        self.config = config
+        self.context = None
+
+    def update(self, rows):
+        """Score rows appended since the last update; returns their scores indexed like rows."""
+        if self.context is None or self.context.empty:
+            combined = rows.reset_index(drop=True)
+        else:
+            combined = pd.concat([self.context, rows], ignore_index=True)
+        scores = score_frame(combined, self.config).iloc[len(combined) - len(rows):]
+        scores.index = rows.index
+        self.context = self._tail(combined)
+        return scores
+
+    def _tail(self, df):
+        keep_from_end = self.config['window']
+        keep = np.zeros(len(df), dtype=bool)
+        for column in ('station', 'vehicle'):
+            codes = _group_codes(df, column)
+            keep |= pd.Series(codes).groupby(codes).cumcount(ascending=False).to_numpy() < keep_from_end
+        if 'date' in df.columns and 'station' in df.columns:
+            days = df['date'].dt.floor('D')
+            keep |= (days == days.groupby(df['station'].to_numpy()).transform('max')).to_numpy()
+        return df[keep].reset_index(drop=True)
@@ -3,13 +3,21 @@ Petrol Analytics Dashboard
 Professional fuel spending analysis and forecasting platform
 """
 
+from datetime import timedelta
+import pandas as pd
 import streamlit as st
-from config import CSS_STYLES
-from data_loader import load_petrol_data, filter_data
-from pages import dashboard_page, analytics_page, data_page
+from config import CSS_STYLES, DATA_CONFIG, FILTER_CONFIG, PERF_CONFIG
+from analytics import date_extent, filter_data, filter_values, load_rejections, source_version
+from data_loader import load_petrol_data, load_fleet_data, open_store
+from fleet import fleet_version
+from datasets import summarise
+from pages import dashboard_page, analytics_page, data_page, performance_panel
+from timing import start_rerun, span, finish_rerun
 
 def main():
     """Main application entry point."""
+    start_rerun()
+    
     # Page configuration
     st.set_page_config(
         page_title="Petrol Analytics Dashboard",
@@ -29,12 +37,29 @@ def main():
     </div>
     """, unsafe_allow_html=True)
     
-    # Load data
-    df = load_petrol_data()
+    # Load data: a directory of vehicle workbooks in fleet mode, otherwise one workbook,
+    # optionally kept in a SQLite store instead of memory
+    fleet_dir = DATA_CONFIG['fleet_dir']
+    store_path = DATA_CONFIG['store_path']
+    with span("load"):
+        if fleet_dir:
+            source = fleet_dir
+            version = fleet_version(fleet_dir)
+        else:
+            source = DATA_CONFIG['source_file']
+            version = source_version(source)
+        
+        if store_path:
+            df = open_store(store_path, source, version, fleet=bool(fleet_dir))
+        elif fleet_dir:
+            df = load_fleet_data(fleet_dir, version)
+        else:
+            df = load_petrol_data(source, version)
     
-    if df.empty:
-        st.error("❌ No data available. Please ensure 'Spend.xlsx' is in the application directory.")
+    if df is None or df.empty:
+        st.error(f"❌ No data available. Please ensure '{source}' is in the application directory.")
         st.info("📁 Expected file format: Excel file with columns for date, station, price, litres, etc.")
+        finish_rerun()
         return
     
     # Navigation
@@ -53,18 +78,41 @@ def main():
         st.markdown('<div class="filter-section">', unsafe_allow_html=True)
         st.header("🎛️ Analytics Filters")
         
+        # Period: a financial year and month, or a date range
+        first_date, last_date = date_extent(df) if 'date' in df.columns else (None, None)
+        recent_ranges = {f"Last {days} Days": days for days in FILTER_CONFIG['recent_days']}
+        period = "Financial Year"
+        if first_date is not None and pd.notna(first_date):
+            period = st.radio(
+                "🗓️ Period",
+                ["Financial Year"] + list(recent_ranges) + ["Custom Range"],
+                help="Recent ranges end at the latest transaction"
+            )
+        
+        selected_dates = None
+        if period in recent_ranges:
+            selected_dates = (last_date - timedelta(days=recent_ranges[period] - 1), last_date)
+        elif period == "Custom Range":
+            chosen = st.date_input(
+                "From / To",
+                value=(first_date.date(), last_date.date()),
+                min_value=first_date.date(),
+                max_value=last_date.date()
+            )
+            # Until the end date is picked the input holds only the start
+            selected_dates = (chosen[0], chosen[-1]) if chosen else None
+        
         # Year filter
-        if 'year' in df.columns:
-            years = sorted(df['year'].unique(), reverse=True)
+        if 'year' in df.columns and selected_dates is None:
+            years = filter_values(df, 'year')[::-1]
             selected_year = st.selectbox("📅 Financial Year", years)
-            df_year = df[df['year'] == selected_year]
         else:
-            df_year = df
             selected_year = None
         
         # Month filter
-        if 'month_name' in df_year.columns:
-            available_months = df_year.sort_values('month_num')['month_name'].unique()
+        if 'month_name' in df.columns and selected_dates is None:
+            with span("year filter"):
+                available_months = filter_values(df, 'month_name', selected_year)
             selected_month = st.selectbox(
                 "📆 Reporting Period",
                 ['All Months'] + list(available_months)
@@ -74,38 +122,51 @@ def main():
         
         # Station filter
         if 'station' in df.columns:
-            stations = ['All Stations'] + sorted(df['station'].unique())
+            stations = ['All Stations'] + filter_values(df, 'station')
             selected_station = st.selectbox("🏪 Service Provider", stations)
         else:
             selected_station = 'All Stations'
         
+        # Vehicle filter (fleet mode)
+        if 'vehicle' in df.columns:
+            vehicles = ['All Vehicles'] + filter_values(df, 'vehicle')
+            selected_vehicle = st.selectbox("🚗 Vehicle", vehicles)
+        else:
+            selected_vehicle = 'All Vehicles'
+        
         st.markdown('</div>', unsafe_allow_html=True)
         
         # Data summary in sidebar
         st.markdown("### 📈 Quick Stats")
-        filtered_preview = filter_data(df, selected_year, selected_month, selected_station)
+        with span("quick stats"):
+            filtered_preview = filter_data(df, selected_year, selected_month, selected_station, selected_vehicle,
+                                           selected_dates)
+            summary = summarise(filtered_preview) if not filtered_preview.empty else None
         
-        if not filtered_preview.empty:
-            total_records = len(filtered_preview)
-            total_spend = filtered_preview['price'].sum() if 'price' in filtered_preview.columns else 0
+        if summary is not None:
+            total_records = summary['rows']
+            total_spend = summary['price']['sum'] if 'price' in summary else 0
             
             st.metric("Records", f"{total_records:,}")
             st.metric("Total Value", f"R{total_spend:,.0f}")
             
-            if 'date' in filtered_preview.columns:
-                date_range = (filtered_preview['date'].max() - filtered_preview['date'].min()).days
+            if 'date_min' in summary:
+                date_range = (summary['date_max'] - summary['date_min']).days
                 st.metric("Period (Days)", date_range)
     
     # Apply filters
-    df_filtered = filter_data(df, selected_year, selected_month, selected_station)
+    with span("filter"):
+        df_filtered = filter_data(df, selected_year, selected_month, selected_station, selected_vehicle, selected_dates)
     
     # Render selected page
-    if page == "📊 Executive Dashboard":
-        dashboard_page(df_filtered)
-    elif page == "🔍 Business Intelligence":
-        analytics_page(df_filtered)
-    elif page == "📋 Data Management":
-        data_page(df_filtered)
+    with span("page"):
+        if page == "📊 Executive Dashboard":
+            dashboard_page(df_filtered)
+        elif page == "🔍 Business Intelligence":
+            # A store has no in-memory history to score anomalies against
+            analytics_page(df_filtered, None if store_path else df)
+        elif page == "📋 Data Management":
+            data_page(df_filtered, load_rejections(df))
     
     # Footer
     st.markdown("---")
@@ -115,6 +176,11 @@ def main():
         "</div>",
         unsafe_allow_html=True
     )
+    
+    # Timing breakdown of this rerun (PERF_CONFIG)
+    records = finish_rerun()
+    if records and PERF_CONFIG['panel']:
+        performance_panel(records)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,157 @@
+"""
+Headless batch reports for the Petrol Analytics Dashboard
+Usage: python batch_report.py <workbook|directory>... [--out DIR] [--format json|parquet] [--workers N]
+
+Runs calculate_kpis, get_insights and generate_predictions for every input
+file without Streamlit, spreading the files over a process pool. Each worker
+writes its own predictions; the parent collects the small KPI and insight
+results and prints throughput.
+
+json writes <stem>.json per input holding everything. parquet writes
+<stem>.predictions.parquet per input plus one reports.parquet with a row of
+KPIs, rows rejected per validation rule (rejected_<rule>) and insights per
+input.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import pandas as pd
+from pools import spawn_pool
+
+OUTPUT_FORMATS = ('json', 'parquet')
+
+def expand_sources(paths):
+    """Input files, with directories replaced by the workbooks directly inside them."""
+    from fleet import discover_workbooks
+
+    sources = []
+    for path in paths:
+        if os.path.isdir(path):
+            sources.extend(discover_workbooks(path))
+        else:
+            sources.append(path)
+    return sources
+
+def _output_stem(source, out_dir):
+    return os.path.join(out_dir, os.path.splitext(os.path.basename(source))[0])
+
+def build_report(source, days_ahead=30, use_snapshot=True):
+    """KPIs, insights and predictions for one source file's valid rows, with rejections per rule."""
+    from analytics import read_petrol_data, calculate_kpis, get_insights, generate_predictions, plain_value
+    from validation import rejection_report, validate
+
+    df, quarantine = validate(read_petrol_data(source, use_snapshot=use_snapshot))
+    rejected = rejection_report(quarantine, len(df) + len(quarantine))['rows']
+    return {
+        'source': source,
+        'rows': len(df),
+        # Rows quarantined per validation rule; a row can break several
+        'rejected': {code: int(rows) for code, rows in rejected.items()},
+        'kpis': {key: plain_value(value) for key, value in calculate_kpis(df).items()},
+        'insights': get_insights(df),
+        'predictions': generate_predictions(df, days_ahead)
+    }
+
+def write_report(report, out_dir, fmt):
+    """Write one report; returns the path written."""
+    stem = _output_stem(report['source'], out_dir)
+    predictions = report['predictions']
+
+    if fmt == 'parquet':
+        path = f"{stem}.predictions.parquet"
+        predictions.to_parquet(path, index=False)
+        return path
+
+    path = f"{stem}.json"
+    document = dict(report, predictions=json.loads(predictions.to_json(orient='records', date_format='iso')))
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2, ensure_ascii=False)
+    return path
+
+def run_one(source, out_dir, fmt, days_ahead=30, use_snapshot=True):
+    """Build and write the report for one file in a worker; returns a small summary."""
+    start = time.perf_counter()
+    try:
+        report = build_report(source, days_ahead, use_snapshot)
+        output = write_report(report, out_dir, fmt)
+    except Exception as e:
+        return {'source': source, 'error': f"{type(e).__name__}: {e}", 'seconds': time.perf_counter() - start}
+
+    return {
+        'source': source,
+        'output': output,
+        'rows': report['rows'],
+        'rejected': report['rejected'],
+        'kpis': report['kpis'],
+        'insights': report['insights'],
+        'seconds': time.perf_counter() - start
+    }
+
+def run_batch(sources, out_dir, fmt='json', workers=None, days_ahead=30, use_snapshot=True):
+    """Report on every source, in a process pool unless workers is 1.
+
+    Returns (summaries in input order, wall-clock seconds).
+    """
+    if fmt not in OUTPUT_FORMATS:
+        raise ValueError(f"Unknown output format: {fmt}")
+    os.makedirs(out_dir, exist_ok=True)
+    workers = min(workers or os.cpu_count() or 1, len(sources)) or 1
+
+    start = time.perf_counter()
+    if workers == 1:
+        summaries = [run_one(source, out_dir, fmt, days_ahead, use_snapshot) for source in sources]
+    else:
+        with spawn_pool(workers) as pool:
+            futures = [pool.submit(run_one, source, out_dir, fmt, days_ahead, use_snapshot) for source in sources]
+            summaries = [future.result() for future in futures]
+    wall = time.perf_counter() - start
+
+    done = [summary for summary in summaries if 'error' not in summary]
+    if fmt == 'parquet' and done:
+        table = pd.DataFrame([
+            {'source': s['source'], 'rows': s['rows'],
+             **{f"rejected_{rule}": rows for rule, rows in s['rejected'].items()},
+             **s['kpis'], 'insights': s['insights']}
+            for s in done
+        ])
+        # A rule no row of a file broke is missing from that file's counts
+        rejected = [column for column in table.columns if column.startswith('rejected_')]
+        table[rejected] = table[rejected].fillna(0).astype('int64')
+        table.to_parquet(os.path.join(out_dir, 'reports.parquet'), index=False)
+    return summaries, wall
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('sources', nargs='+', help="Workbooks, or directories of workbooks")
+    parser.add_argument('--out', default='reports', help="Output directory (default: reports)")
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='json')
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: one per CPU)")
+    parser.add_argument('--days-ahead', type=int, default=30)
+    parser.add_argument('--no-snapshot', action='store_true', help="Always parse the workbooks instead of reusing snapshots")
+    args = parser.parse_args()
+
+    sources = expand_sources(args.sources)
+    if not sources:
+        parser.error("no input workbooks found")
+
+    summaries, wall = run_batch(sources, args.out, args.format, args.workers, args.days_ahead, not args.no_snapshot)
+
+    failed = [summary for summary in summaries if 'error' in summary]
+    for summary in summaries:
+        if 'error' in summary:
+            print(f"FAILED {summary['source']}: {summary['error']}", file=sys.stderr)
+        else:
+            rejected = ', '.join(f"{rule}={rows}" for rule, rows in summary['rejected'].items()) or 'none'
+            print(f"{summary['source']}: rows={summary['rows']}, rejected: {rejected}, "
+                  f"seconds={summary['seconds']:.3f} -> {summary['output']}")
+
+    rows = sum(summary.get('rows', 0) for summary in summaries)
+    print(f"batch: files={len(summaries)}, failed={len(failed)}, rows={rows}, wall_s={wall:.3f}, "
+          f"files_per_s={len(summaries) / wall:.2f}, rows_per_s={rows / wall:.0f}")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
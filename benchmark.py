@@ -0,0 +1,563 @@
+"""
+Performance benchmarks for the Petrol Analytics Dashboard
+Usage: python benchmark.py <benchmark> [--rows N] [--output results.json] [--compare baseline.json]
+
+Every result is printed as a line and collected; --output writes them with
+environment metadata as JSON, and --compare checks the timings and peak
+memory against an earlier results file, exiting non-zero on regressions.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from synthetic import STATIONS, generate_transactions
+
+RESULTS = []
+# Result fields compared against a baseline; all are lower-is-better
+COST_SUFFIXES = ('_s', '_ms', '_us', '_mb')
+
+def make_transactions(rows, seed=0):
+    """Build a raw transaction frame shaped like Spend.xlsx."""
+    return generate_transactions(rows, seed)
+
+def make_prepared(rows, seed=0):
+    """Synthetic transactions run through prepare_data, as the pages see them."""
+    from analytics import prepare_data
+    return prepare_data(make_transactions(rows, seed))
+
+def timed(func, *args, **kwargs):
+    """Run func once and return (result, seconds)."""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+def peak_memory(func, *args, **kwargs):
+    """Run func once and return (result, seconds, peak traced MiB)."""
+    tracemalloc.start()
+    try:
+        result, seconds = timed(func, *args, **kwargs)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, seconds, peak / 2 ** 20
+
+def report(name, **values):
+    """Print one benchmark result line and keep it for --output."""
+    from analytics import plain_value
+
+    RESULTS.append({'benchmark': name, **{key: plain_value(value) for key, value in values.items()}})
+    fields = ', '.join(f"{key}={value:.4f}" if isinstance(value, float) else f"{key}={value}" for key, value in values.items())
+    print(f"{name}: {fields}")
+
+def bench_snapshot(rows):
+    """Cold (openpyxl parse) versus warm (Parquet snapshot) workbook loads."""
+    from config import DATA_CONFIG
+    from analytics import read_petrol_data
+
+    with tempfile.TemporaryDirectory() as tmp:
+        DATA_CONFIG['cache_dir'] = os.path.join(tmp, 'cache')
+        source = os.path.join(tmp, 'Spend.xlsx')
+        make_transactions(rows).to_excel(source, index=False)
+
+        _, no_cache = timed(read_petrol_data, source, use_snapshot=False)
+        _, cold = timed(read_petrol_data, source)
+        _, warm = timed(read_petrol_data, source)
+        os.utime(source)
+        _, touched = timed(read_petrol_data, source)
+
+    report('snapshot', rows=rows, no_cache_s=no_cache, cold_s=cold, warm_s=warm,
+           touched_s=touched, speedup=no_cache / warm)
+
+def bench_ingest(rows):
+    """Peak memory of pd.read_excel versus the streaming batch reader."""
+    from excel_reader import read_workbook
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = os.path.join(tmp, 'Spend.xlsx')
+        make_transactions(rows).to_excel(source, index=False)
+
+        eager, eager_s, eager_mb = peak_memory(pd.read_excel, source)
+        streamed, stream_s, stream_mb = peak_memory(read_workbook, source, batch_size=10000)
+
+    frame_mb = streamed.memory_usage(deep=True).sum() / 2 ** 20
+    report('ingest', rows=rows, read_excel_s=eager_s, read_excel_peak_mb=eager_mb,
+           streaming_s=stream_s, streaming_peak_mb=stream_mb, frame_mb=frame_mb)
+
+def bench_incremental(rows):
+    """Full rebuild versus appending a 1% tail to an existing snapshot."""
+    from config import DATA_CONFIG
+    from analytics import read_petrol_data
+
+    transactions = make_transactions(rows)
+    head = transactions.iloc[:rows - max(rows // 100, 1)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        DATA_CONFIG['cache_dir'] = os.path.join(tmp, 'cache')
+        source = os.path.join(tmp, 'Spend.xlsx')
+        head.to_excel(source, index=False)
+        read_petrol_data(source)
+
+        transactions.to_excel(source, index=False)
+        _, full = timed(read_petrol_data, source, use_snapshot=False)
+        _, appended = timed(read_petrol_data, source)
+
+    report('incremental', rows=rows, appended_rows=rows - len(head), full_rebuild_s=full, append_s=appended)
+
+def bench_filter(rows, repeat=20):
+    """Indexed filter_data versus copy-and-mask (try --rows 1000000)."""
+    from analytics import filter_data
+    from datasets import register_dataset
+
+    plain = make_prepared(rows)
+    indexed = plain.copy()
+    _, build_s = timed(register_dataset, indexed)
+
+    selections = [(2021, None, None), (2021, 'March', None), (2021, 'March', STATIONS[0]), (None, None, STATIONS[1])]
+    for selection in selections:
+        _, mask_s = timed(lambda: [filter_data(plain, *selection) for _ in range(repeat)])
+        _, index_s = timed(lambda: [filter_data(indexed, *selection) for _ in range(repeat)])
+        report('filter', rows=rows, selection='/'.join(str(part) for part in selection), build_s=build_s,
+               mask_ms=1000 * mask_s / repeat, index_ms=1000 * index_s / repeat)
+
+def bench_daterange(rows, repeat=20):
+    """Date-range filter_data: sorted-index slices versus boolean masks on an unregistered copy."""
+    from analytics import filter_data
+    from datasets import register_dataset
+
+    plain = make_prepared(rows)
+    indexed = register_dataset(plain.copy())
+    last = plain['date'].max()
+    selections = [((last - pd.Timedelta(days=89), last), None), ((last - pd.Timedelta(days=364), last), None),
+                  ((last - pd.Timedelta(days=364), last), STATIONS[0])]
+    for dates, station in selections:
+        _, mask_s = timed(lambda: [filter_data(plain, station=station, date_range=dates) for _ in range(repeat)])
+        _, index_s = timed(lambda: [filter_data(indexed, station=station, date_range=dates) for _ in range(repeat)])
+        view = filter_data(indexed, station=station, date_range=dates)
+        report('daterange', rows=rows, days=(dates[1] - dates[0]).days + 1, station=str(station), result_rows=len(view),
+               zero_copy=bool(np.shares_memory(view['price'].to_numpy(), indexed['price'].to_numpy())),
+               mask_ms=1000 * mask_s / repeat, index_ms=1000 * index_s / repeat)
+
+def bench_store(rows):
+    """SQLite store: one-off write, then filtered reads and SQL aggregates versus the in-memory frame."""
+    from analytics import filter_data, calculate_kpis
+    from datasets import register_dataset
+    from store import TransactionStore
+
+    df = register_dataset(make_prepared(rows))
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'transactions.db')
+        store, write_s = timed(TransactionStore(path).write, df, 'benchmark')
+        size_mb = os.path.getsize(path) / 2 ** 20
+
+        selections = [(2021, None, None), (2021, 'March', None), (2021, 'March', STATIONS[0])]
+        for selection in selections:
+            _, memory_s = timed(lambda: calculate_kpis.__wrapped__(filter_data(df, *selection)))
+            # Straight to the store, bypassing the row cache
+            criteria = dict(zip(('year', 'month_name', 'station'), selection))
+            view, read_s = timed(store.rows, {column: value for column, value in criteria.items() if value})
+            stored, kpi_s = timed(calculate_kpis.__wrapped__, view)
+            report('store', rows=rows, selection='/'.join(str(part) for part in selection), result_rows=len(view),
+                   write_s=write_s, size_mb=size_mb, memory_ms=1000 * memory_s,
+                   read_ms=1000 * read_s, sql_kpis_ms=1000 * kpi_s)
+
+def bench_memory(rows):
+    """Memory saved by compact_frame and the KPI drift it introduces."""
+    from analytics import compact_frame, memory_report, calculate_kpis
+
+    full = make_prepared(rows)
+    compact, compact_s = timed(compact_frame, full)
+    print(memory_report(full, compact).to_string())
+
+    before, after = calculate_kpis(full), calculate_kpis(compact)
+    drift = max(abs(after[key] - before[key]) / abs(before[key]) for key in before if before[key])
+    report('memory', rows=rows, compact_s=compact_s, max_kpi_rel_drift=float(drift))
+
+def bench_rollup(rows, repeat=5):
+    """KPIs, insights and aggregate charts from the rollup cube versus raw rows."""
+    import charts
+    from analytics import filter_data, calculate_kpis, get_insights
+    from datasets import register_dataset
+
+    plain = make_prepared(rows)
+    registered = register_dataset(plain.copy())
+
+    def aggregate_stage(df):
+        calculate_kpis(df)
+        get_insights(df)
+        charts.create_station_comparison_chart(df)
+        charts.create_monthly_summary_chart(df)
+
+    for selection in [(None, None, None), (2021, None, None), (2021, 'March', STATIONS[0])]:
+        raw_view = filter_data(plain, *selection)
+        cube_view = filter_data(registered, *selection)
+        _, raw_s = timed(lambda: [aggregate_stage(raw_view) for _ in range(repeat)])
+        _, cube_s = timed(lambda: [aggregate_stage(cube_view) for _ in range(repeat)])
+        report('rollup', rows=rows, selection='/'.join(str(part) for part in selection),
+               raw_ms=1000 * raw_s / repeat, cube_ms=1000 * cube_s / repeat)
+
+def _separate_reductions(df):
+    """The column-by-column reductions Quick Stats, KPIs and insights used to run."""
+    df['price'].sum(), df['date'].max() - df['date'].min()
+    df['price'].sum(), df['litres'].sum(), df['liter_price'].mean(), df['date'].max() - df['date'].min()
+    df.groupby('station')['price'].sum().sort_values(ascending=False)
+    df['liter_price'].mean(), df['liter_price'].std(), df['litres'].mean(), df['litres'].sum()
+    df['date'].max() - df['date'].min()
+
+def bench_fused(rows, repeat=10):
+    """One fused aggregation pass versus separate pandas reductions."""
+    from aggregate import fused_summary
+
+    df = make_prepared(rows)
+    _, separate_s = timed(lambda: [_separate_reductions(df) for _ in range(repeat)])
+    _, fused_s = timed(lambda: [fused_summary(df) for _ in range(repeat)])
+    report('fused', rows=rows, separate_ms=1000 * separate_s / repeat, fused_ms=1000 * fused_s / repeat)
+
+def bench_forecast(rows, series=500, repeat=5):
+    """Closed-form forecasts versus scikit-learn, single series and batched."""
+    from forecast import linear_forecast, batch_linear_forecast
+
+    df = make_prepared(rows)
+    _, closed_s = timed(lambda: [linear_forecast(df['date'], df['price']) for _ in range(repeat)])
+    values = {'closed_form_ms': 1000 * closed_s / repeat}
+
+    try:
+        from sklearn.linear_model import LinearRegression
+    except ImportError:
+        LinearRegression = None
+    if LinearRegression is not None:
+        def sklearn_fit():
+            days = (df['date'] - df['date'].min()).dt.days.to_numpy().reshape(-1, 1)
+            model = LinearRegression().fit(days, df['price'].to_numpy())
+            model.predict(np.arange(days.max() + 1, days.max() + 31).reshape(-1, 1))
+        _, sklearn_s = timed(lambda: [sklearn_fit() for _ in range(repeat)])
+        values['sklearn_ms'] = 1000 * sklearn_s / repeat
+
+    df['series'] = np.arange(rows) % series
+    _, batch_s = timed(batch_linear_forecast, df, 'series')
+    report('forecast', rows=rows, series=series, batch_ms=1000 * batch_s, **values)
+
+def bench_backtest(rows, series=500):
+    """All forecast models with rolling-origin backtests for many series, in-process and pooled."""
+    from forecast import forecast_series
+
+    df = make_prepared(rows)
+    df['series'] = np.arange(rows) % series
+    (_, accuracy), serial_s = timed(forecast_series, df, 'series', workers=1)
+    values = {'serial_ms': 1000 * serial_s}
+    workers = os.cpu_count() or 1
+    if workers > 1:
+        import config
+        threshold = config.FORECAST_CONFIG['parallel_min_series']
+        config.FORECAST_CONFIG['parallel_min_series'] = 0
+        try:
+            _, pool_s = timed(forecast_series, df, 'series', workers=workers)
+        finally:
+            config.FORECAST_CONFIG['parallel_min_series'] = threshold
+        values.update(workers=workers, pool_ms=1000 * pool_s)
+    report('backtest', rows=rows, series=series, **values,
+           **{f'{model}_mae': error for model, error in accuracy.groupby('model')['mae'].mean().items()})
+
+def bench_charts(rows):
+    """Payload size and build+serialise time of the time-series charts, full versus downsampled.
+
+    Browser render time cannot be measured from Python; payload size is its proxy.
+    The trend and price charts plot daily periods of a 10-year history, so
+    their series outgrow CHART_CONFIG['max_points'] as the consumption
+    chart's transactions do.
+    """
+    import charts
+    from analytics import prepare_data
+    from config import CHART_CONFIG
+
+    df = prepare_data(generate_transactions(rows, years=10))
+    defaults = dict(CHART_CONFIG)
+    builders = [(charts.create_spending_trend_chart, ('daily',)), (charts.create_price_analysis_chart, ('daily',)),
+                (charts.create_consumption_chart, ())]
+
+    for label, overrides in (('full', {'max_points': None, 'webgl_threshold': float('inf')}), ('downsampled', {})):
+        CHART_CONFIG.update(defaults, **overrides)
+        for builder, args in builders:
+            payload, seconds = timed(lambda: builder(df, *args).to_json())
+            report('charts', rows=rows, mode=label, chart=builder.__name__, payload_kb=len(payload) / 1024, build_ms=1000 * seconds)
+    CHART_CONFIG.update(defaults)
+
+def bench_exports(rows):
+    """Per-rerun cost of eager CSV+JSON exports versus deferred ones, and each format on click."""
+    from exports import EXPORT_FORMATS, deferred_export, export_file
+
+    df = make_prepared(rows)
+
+    def eager_rerun():
+        df.to_csv(index=False)
+        df.to_json(orient='records', date_format='iso')
+
+    def lazy_rerun():
+        for fmt in EXPORT_FORMATS:
+            deferred_export(df, fmt)
+
+    # tracemalloc slows pandas writers badly, so time and memory are measured in separate runs
+    _, eager_s = timed(eager_rerun)
+    _, lazy_s = timed(lazy_rerun)
+    eager_mb = peak_memory(eager_rerun)[2]
+    lazy_mb = peak_memory(lazy_rerun)[2]
+    report('exports', rows=rows, stage='rerun', eager_ms=1000 * eager_s, eager_peak_mb=eager_mb,
+           lazy_ms=1000 * lazy_s, lazy_peak_mb=lazy_mb)
+
+    for fmt in EXPORT_FORMATS:
+        buffer, seconds = timed(export_file, df, fmt)
+        peak_mb = peak_memory(export_file, df, fmt)[2]
+        report('exports', rows=rows, stage='click', format=fmt, ms=1000 * seconds,
+               peak_mb=peak_mb, size_mb=len(buffer.getvalue()) / 2 ** 20)
+
+def bench_fleet(rows, vehicles=8):
+    """Fleet load time with one worker versus a process pool, without snapshots."""
+    from fleet import load_fleet
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for vehicle in range(vehicles):
+            make_transactions(rows // vehicles, seed=vehicle).to_excel(os.path.join(tmp, f"vehicle{vehicle:02d}.xlsx"), index=False)
+
+        (df, _, _), serial = timed(load_fleet, tmp, workers=1, use_snapshot=False)
+        _, pooled = timed(load_fleet, tmp, workers=None, use_snapshot=False)
+
+    report('fleet', rows=len(df), vehicles=vehicles, workers=min(os.cpu_count() or 1, vehicles),
+           serial_s=serial, pool_s=pooled, speedup=serial / pooled)
+
+def bench_timeseries(rows, tail=0.01):
+    """Full resample versus folding a 1% tail into an existing RollingSeries."""
+    from timeseries import FREQUENCIES, RollingSeries
+
+    df = make_prepared(rows)
+    cut = rows - max(int(rows * tail), 1)
+    head, new_rows = df.iloc[:cut], df.iloc[cut:]
+    for frequency in FREQUENCIES:
+        _, full_s = timed(RollingSeries, df, frequency)
+        series = RollingSeries(head, frequency)
+        _, extend_s = timed(series.extend, new_rows)
+        report('timeseries', rows=rows, frequency=frequency, periods=len(series),
+               full_ms=1000 * full_s, extend_ms=1000 * extend_s)
+
+def bench_anomalies(rows, tail=0.01):
+    """Full anomaly scoring versus streaming a 1% tail through StreamingDetector."""
+    from anomalies import StreamingDetector, score_frame
+
+    df = make_prepared(rows)
+    cut = rows - max(int(rows * tail), 1)
+    scores, full_s = timed(score_frame, df)
+    detector = StreamingDetector()
+    detector.update(df.iloc[:cut])
+    _, update_s = timed(detector.update, df.iloc[cut:])
+    report('anomalies', rows=rows, flagged=int(scores['flagged'].sum()),
+           full_ms=1000 * full_s, update_ms=1000 * update_s)
+
+def bench_validation(rows, dirty=0.01, seed=0):
+    """prepare_data plus the vectorised validation rules, with a share of rows made invalid."""
+    from analytics import prepare_data
+    from validation import validate
+
+    raw = make_transactions(rows, seed)
+    rng = np.random.default_rng(seed)
+    bad = rng.random(rows) < dirty
+    raw.loc[bad, raw.columns[raw.columns.str.lower() == 'litres']] = 0
+    prepared, prepare_s = timed(prepare_data, raw)
+    (clean, quarantine), validate_s = timed(validate, prepared)
+    report('validation', rows=rows, quarantined=len(quarantine), clean_rows=len(clean),
+           prepare_s=prepare_s, validate_s=validate_s, rows_per_s=rows / (prepare_s + validate_s))
+
+def bench_warmup(rows):
+    """First request for each likely selection with cold caches versus after the background warm-up."""
+    from config import WARMUP_CONFIG
+    from datasets import register_dataset
+    from memo import clear_caches
+    from warmup import likely_selections, start_warmup, warm_selection, warmup_status
+
+    df = register_dataset(make_prepared(rows))
+    selections = likely_selections(df)
+    clear_caches()
+    _, cold_s = timed(lambda: [warm_selection(df, selection) for selection in selections])
+
+    clear_caches()
+    futures, submit_s = timed(start_warmup, df, dict(WARMUP_CONFIG, enabled=True))
+    for future in futures:
+        future.result()
+    _, warm_s = timed(lambda: [warm_selection(df, selection) for selection in selections])
+    report('warmup', rows=rows, selections=len(selections), submit_ms=1000 * submit_s,
+           background_s=warmup_status()['seconds'], cold_ms=1000 * cold_s / len(selections),
+           warm_ms=1000 * warm_s / len(selections))
+
+def bench_spans(rows, repeat=100000):
+    """Cost of one timing span with instrumentation off and on (rows is ignored)."""
+    import timing
+    from config import PERF_CONFIG
+
+    def run():
+        for _ in range(repeat):
+            with timing.span('stage'):
+                pass
+
+    costs = {}
+    for label, enabled in (('disabled', False), ('enabled', True)):
+        PERF_CONFIG['enabled'] = enabled
+        timing.start_rerun()
+        _, seconds = timed(run)
+        timing.finish_rerun()
+        costs[f'{label}_us'] = 1e6 * seconds / repeat
+    PERF_CONFIG['enabled'] = False
+    report('spans', repeat=repeat, **costs)
+
+PIPELINE_LOAD_ROWS = 50000
+
+def _stage(rows, stage, func, *args, **kwargs):
+    """Time one pipeline stage from cold caches, then measure its peak memory in a second run."""
+    from memo import clear_caches
+
+    clear_caches()
+    result, seconds = timed(func, *args, **kwargs)
+    # tracemalloc slows pandas down, so peak memory gets a run of its own
+    clear_caches()
+    peak_mb = peak_memory(func, *args, **kwargs)[2]
+    report('pipeline', rows=rows, stage=stage, ms=1000 * seconds, peak_mb=peak_mb)
+    return result
+
+def bench_pipeline(rows):
+    """Time and peak memory of every dashboard stage, from generation to charts (10k to 10M rows).
+
+    Workbook loading is measured on at most PIPELINE_LOAD_ROWS rows, since
+    writing a large workbook takes far longer than anything being measured.
+    """
+    import charts
+    from config import DATA_CONFIG
+    from analytics import prepare_data, read_petrol_data, filter_data, calculate_kpis, get_insights, generate_predictions
+    from datasets import register_dataset
+
+    load_rows = min(rows, PIPELINE_LOAD_ROWS)
+    with tempfile.TemporaryDirectory() as tmp:
+        DATA_CONFIG['cache_dir'] = os.path.join(tmp, 'cache')
+        source = os.path.join(tmp, 'Spend.xlsx')
+        generate_transactions(load_rows).to_excel(source, index=False)
+        _stage(load_rows, 'load_parse', read_petrol_data, source, use_snapshot=False)
+        read_petrol_data(source)
+        _stage(load_rows, 'load_snapshot', read_petrol_data, source)
+
+    raw = _stage(rows, 'generate', generate_transactions, rows)
+    df = _stage(rows, 'prepare', lambda: prepare_data(raw.copy()))
+    del raw
+    df = _stage(rows, 'register', register_dataset, df)
+
+    year = int(df['year'].iloc[len(df) // 2]) if len(df) else None
+    selections = [(year, None, None), (year, 'March', None), (year, 'March', STATIONS[0])]
+    views = _stage(rows, 'filter', lambda: [filter_data(df, *selection) for selection in selections])
+
+    for label, frame in (('all', df), ('filtered', views[0])):
+        _stage(rows, f'kpis_{label}', calculate_kpis, frame)
+        _stage(rows, f'insights_{label}', get_insights, frame)
+        _stage(rows, f'predictions_{label}', generate_predictions, frame)
+
+    for builder in (charts.create_spending_trend_chart, charts.create_station_comparison_chart,
+                    charts.create_price_analysis_chart, charts.create_consumption_chart,
+                    charts.create_monthly_summary_chart):
+        _stage(rows, builder.__name__.replace('create_', ''), builder, df)
+
+BENCHMARKS = {
+    'snapshot': bench_snapshot,
+    'ingest': bench_ingest,
+    'incremental': bench_incremental,
+    'filter': bench_filter,
+    'daterange': bench_daterange,
+    'store': bench_store,
+    'memory': bench_memory,
+    'rollup': bench_rollup,
+    'fused': bench_fused,
+    'forecast': bench_forecast,
+    'backtest': bench_backtest,
+    'charts': bench_charts,
+    'exports': bench_exports,
+    'fleet': bench_fleet,
+    'pipeline': bench_pipeline,
+    'spans': bench_spans,
+    'timeseries': bench_timeseries,
+    'anomalies': bench_anomalies,
+    'validation': bench_validation,
+    'warmup': bench_warmup
+}
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def write_results(path):
+    """Write collected results with the environment they were measured in."""
+    document = {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'argv': sys.argv[1:],
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'results': RESULTS
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(document, f, indent=2)
+
+def _result_key(result):
+    """Identity of a result: its benchmark name and every non-cost field."""
+    return tuple(sorted((key, value) for key, value in result.items() if not key.endswith(COST_SUFFIXES)
+                        and not isinstance(value, float)))
+
+def compare_results(baseline_path, tolerance):
+    """Print cost ratios against a baseline results file; returns the number of regressions."""
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = {_result_key(result): result for result in json.load(f)['results']}
+
+    regressions = 0
+    for result in RESULTS:
+        previous = baseline.get(_result_key(result))
+        if previous is None:
+            continue
+        for key, value in result.items():
+            if not key.endswith(COST_SUFFIXES) or not previous.get(key):
+                continue
+            ratio = value / previous[key]
+            if ratio > tolerance:
+                regressions += 1
+                label = ', '.join(f"{k}={v}" for k, v in _result_key(result))
+                print(f"REGRESSION {label}: {key} {previous[key]:.4f} -> {value:.4f} ({ratio:.2f}x)")
+    print(f"compare: baseline={baseline_path}, tolerance={tolerance:.2f}x, regressions={regressions}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS) + ['all'])
+    parser.add_argument('--rows', type=int, default=20000)
+    parser.add_argument('--output', help="Write results and environment metadata to this JSON file")
+    parser.add_argument('--compare', help="Baseline JSON file written by an earlier --output run")
+    parser.add_argument('--tolerance', type=float, default=1.25, help="Slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    names = sorted(BENCHMARKS) if args.benchmark == 'all' else [args.benchmark]
+    for name in names:
+        BENCHMARKS[name](args.rows)
+
+    if args.output:
+        write_results(args.output)
+    if args.compare and compare_results(args.compare, args.tolerance):
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,47 +1,111 @@
+import numpy as np
 import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from config import COLORS, CHART_CONFIG
+from config import COLORS, CHART_CONFIG, TIMESERIES_CONFIG
+from datasets import breakdown, summarise
+from downsample import downsample_indices
+from memo import memoize
+from timeseries import resample
 
-def create_spending_trend_chart(df):
-    """Create smooth spending trend line chart."""
+def _time_series(df, column):
+    """Date-sorted, NaN-free points of column, downsampled to the chart point budget."""
+    points = df[['date', column]].dropna().sort_values('date', kind='stable')
+    indices = downsample_indices(
+        points['date'].to_numpy(dtype='datetime64[ns]').view('int64'),
+        points[column].to_numpy(dtype='float64'),
+        CHART_CONFIG['max_points']
+    )
+    return points.iloc[indices]
+
+def _periods(df, frequency, column):
+    """Resampled series of df, LTTB-downsampled on column when it has more periods than the point budget.
+    
+    Periods where column is missing are dropped along with the rest once the
+    series is downsampled; every trace of a chart uses the same kept periods.
+    """
+    series = resample(df, frequency)
+    max_points = CHART_CONFIG['max_points']
+    if max_points is None or len(series) <= max_points:
+        return series
+    values = series[column].to_numpy(dtype='float64')
+    present = np.flatnonzero(~np.isnan(values))
+    kept = downsample_indices(series.index.to_numpy(dtype='datetime64[ns]').view('int64')[present],
+                              values[present], max_points)
+    return series.iloc[present[kept]]
+
+def _scatter(n_points, line, **kwargs):
+    """Scatter trace, switched to WebGL when it draws more than the configured number of points.
+    
+    n_points is counted after downsampling, so this only happens with
+    max_points off or above webgl_threshold. Scattergl cannot draw spline
+    lines, so the smoothing options are dropped there.
+    """
+    if n_points > CHART_CONFIG['webgl_threshold']:
+        line = {key: value for key, value in line.items() if key not in ('shape', 'smoothing')}
+        return go.Scattergl(line=line, **kwargs)
+    return go.Scatter(line=line, **kwargs)
+
+PERIOD_LABELS = {'daily': 'Daily', 'weekly': 'Weekly', 'monthly': 'Monthly'}
+
+@memoize('figures')
+def create_spending_trend_chart(df, frequency=TIMESERIES_CONFIG['chart_frequency']):
+    """Create spending per period with its rolling mean and EWMA."""
     if df.empty or 'date' not in df.columns or 'price' not in df.columns:
         return go.Figure()
     
-    df_sorted = df.sort_values('date')
+    series = _periods(df, frequency, 'spend')
+    label = PERIOD_LABELS[frequency]
     
     fig = go.Figure()
-    fig.add_trace(go.Scatter(
-        x=df_sorted['date'],
-        y=df_sorted['price'],
-        mode='lines+markers',
+    fig.add_trace(go.Bar(
+        x=series.index,
+        y=series['spend'],
+        marker=dict(color=COLORS['primary'], opacity=0.35),
+        name=f'{label} Spend',
+        hovertemplate='<b>%{x|%Y-%m-%d}</b><br>Spend: R%{y:,.2f}<extra></extra>'
+    ))
+    fig.add_trace(_scatter(
+        len(series),
+        x=series.index,
+        y=series['spend_rolling'],
+        mode='lines',
         line=dict(
             color=COLORS['primary'],
             width=CHART_CONFIG['line_style']['width'],
             shape=CHART_CONFIG['line_style']['shape'],
             smoothing=CHART_CONFIG['line_style']['smoothing']
         ),
-        marker=dict(size=8, color=COLORS['primary']),
-        name='Spending',
-        hovertemplate='<b>%{x}</b><br>Amount: R%{y:.2f}<extra></extra>'
+        name='Rolling Mean',
+        hovertemplate='<b>%{x|%Y-%m-%d}</b><br>Rolling mean: R%{y:,.2f}<extra></extra>'
+    ))
+    fig.add_trace(_scatter(
+        len(series),
+        x=series.index,
+        y=series['spend_ewma'],
+        mode='lines',
+        line=dict(color=COLORS['secondary'], width=2, dash='dot'),
+        name='EWMA',
+        hovertemplate='<b>%{x|%Y-%m-%d}</b><br>EWMA: R%{y:,.2f}<extra></extra>'
     ))
     
     fig.update_layout(
         title=dict(text="💸 Spending Trend Analysis", font=dict(size=20, color=COLORS['text'])),
         **CHART_CONFIG['layout'],
-        xaxis_title="Date",
+        xaxis_title="Period",
         yaxis_title="Amount (R)",
-        showlegend=False
+        legend=dict(orientation='h', y=-0.2)
     )
     
     return fig
 
+@memoize('figures')
 def create_station_comparison_chart(df):
     """Create station spending comparison chart."""
     if 'station' not in df.columns or 'price' not in df.columns:
         return go.Figure()
     
-    station_data = df.groupby('station')['price'].sum().sort_values(ascending=True)
+    station_data = breakdown(df, ['station']).sort_values(ascending=True)
     
     fig = go.Figure()
     fig.add_trace(go.Bar(
@@ -66,26 +130,56 @@ def create_station_comparison_chart(df):
     
     return fig
 
-def create_price_analysis_chart(df):
-    """Create fuel price analysis chart."""
+@memoize('figures')
+def create_price_analysis_chart(df, frequency=TIMESERIES_CONFIG['chart_frequency']):
+    """Create average price per period with EWMA and a rolling volatility band."""
     if 'date' not in df.columns or 'liter_price' not in df.columns:
         return go.Figure()
     
+    series = _periods(df, frequency, 'price')
+    priced = series.dropna(subset=['price'])
+    label = PERIOD_LABELS[frequency]
+    
     fig = go.Figure()
     
+    # Rolling mean +/- one rolling standard deviation
+    band = series.dropna(subset=['price_rolling'])
+    volatility = band['price_volatility'].fillna(0)
+    fig.add_trace(_scatter(
+        len(band),
+        x=list(band.index) + list(band.index[::-1]),
+        y=list(band['price_rolling'] + volatility) + list((band['price_rolling'] - volatility)[::-1]),
+        fill='toself',
+        fillcolor='rgba(127, 127, 127, 0.15)',
+        mode='lines',
+        line=dict(width=0),
+        name='Rolling ±1σ',
+        hoverinfo='skip'
+    ))
+    
     # Add price trend line
-    fig.add_trace(go.Scatter(
-        x=df['date'],
-        y=df['liter_price'],
+    fig.add_trace(_scatter(
+        len(priced),
+        x=priced.index,
+        y=priced['price'],
         mode='lines+markers',
         line=dict(color=COLORS['accent'], width=3),
         marker=dict(size=6, color=COLORS['accent']),
-        name='Price per Litre',
-        hovertemplate='<b>%{x}</b><br>Price: R%{y:.2f}/L<extra></extra>'
+        name=f'{label} Price per Litre',
+        hovertemplate='<b>%{x|%Y-%m-%d}</b><br>Price: R%{y:.2f}/L<extra></extra>'
+    ))
+    fig.add_trace(_scatter(
+        len(series),
+        x=series.index,
+        y=series['price_ewma'],
+        mode='lines',
+        line=dict(color=COLORS['primary'], width=2, dash='dot'),
+        name='EWMA',
+        hovertemplate='<b>%{x|%Y-%m-%d}</b><br>EWMA: R%{y:.2f}/L<extra></extra>'
     ))
     
-    # Add average line
-    avg_price = df['liter_price'].mean()
+    # Add average line, from the rollup cube where df is a registered view
+    avg_price = summarise(df)['liter_price']['mean']
     fig.add_hline(
         y=avg_price,
         line_dash="dash",
@@ -96,24 +190,27 @@ def create_price_analysis_chart(df):
     fig.update_layout(
         title=dict(text="📈 Fuel Price Analysis", font=dict(size=20, color=COLORS['text'])),
         **CHART_CONFIG['layout'],
-        xaxis_title="Date",
+        xaxis_title="Period",
         yaxis_title="Price per Litre (R)",
-        showlegend=False
+        legend=dict(orientation='h', y=-0.2)
     )
     
     return fig
 
+@memoize('figures')
 def create_consumption_chart(df):
     """Create fuel consumption chart."""
     if 'date' not in df.columns or 'litres' not in df.columns:
         return go.Figure()
     
+    points = _time_series(df, 'litres')
+    
     fig = go.Figure()
     fig.add_trace(go.Bar(
-        x=df['date'],
-        y=df['litres'],
+        x=points['date'],
+        y=points['litres'],
         marker=dict(
-            color=df['litres'],
+            color=points['litres'],
             colorscale='Viridis',
             showscale=False
         ),
@@ -161,12 +258,46 @@ def create_prediction_chart(predictions_df):
     
     return fig
 
+MODEL_LABELS = {'linear': 'Linear Trend', 'exponential': 'Exponential Smoothing', 'seasonal_naive': 'Seasonal Naive'}
+
+def create_group_forecast_chart(forecasts, by, model):
+    """Create one forecast line per station or vehicle for the chosen model."""
+    if forecasts.empty or by not in forecasts.columns:
+        return go.Figure()
+    
+    chosen = forecasts[forecasts['model'] == model]
+    palette = px.colors.qualitative.Set2
+    
+    fig = go.Figure()
+    for number, (group, points) in enumerate(chosen.groupby(by, observed=True, sort=True)):
+        fig.add_trace(go.Scatter(
+            x=points['period'],
+            y=points['predicted'],
+            mode='lines+markers',
+            line=dict(color=palette[number % len(palette)], width=2),
+            marker=dict(size=5),
+            name=str(group),
+            hovertemplate=f'<b>{group}</b><br>%{{x|%Y-%m-%d}}<br>Predicted: R%{{y:,.2f}}<extra></extra>'
+        ))
+    
+    fig.update_layout(
+        title=dict(text=f"🔮 {MODEL_LABELS.get(model, model)} Forecast by {by.title()}",
+                   font=dict(size=20, color=COLORS['text'])),
+        **CHART_CONFIG['layout'],
+        xaxis_title="Period",
+        yaxis_title="Predicted Spend (R)",
+        legend=dict(orientation='h', y=-0.2)
+    )
+    
+    return fig
+
+@memoize('figures')
 def create_monthly_summary_chart(df):
     """Create monthly spending summary chart."""
     if 'month_name' not in df.columns or 'price' not in df.columns:
         return go.Figure()
     
-    monthly_data = df.groupby(['month_num', 'month_name'])['price'].sum().reset_index()
+    monthly_data = breakdown(df, ['month_num', 'month_name']).reset_index()
     monthly_data = monthly_data.sort_values('month_num')
     
     fig = go.Figure()
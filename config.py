@@ -1,5 +1,137 @@
 # Configuration and styling for the Petrol Analytics Dashboard
 
+import os
+
+DATA_CONFIG = {
+    # Workbook the dashboard opens; override with the PETROL_SOURCE_FILE environment variable
+    'source_file': os.environ.get('PETROL_SOURCE_FILE', 'Spend.xlsx'),
+    # Directory with one workbook per vehicle; when set the dashboard runs in fleet mode
+    'fleet_dir': os.environ.get('PETROL_FLEET_DIR') or None,
+    # Worker processes for fleet loading (None: one per CPU)
+    'fleet_workers': None,
+    # SQLite file that backs filters and aggregates instead of an in-memory frame;
+    # override with the PETROL_STORE environment variable (unset: keep data in memory)
+    'store_path': os.environ.get('PETROL_STORE') or None,
+    'cache_dir': '.cache',
+    'snapshot_enabled': True,
+    'incremental': True,
+    'streaming': True,
+    'sheets': None,
+    'batch_size': 50000,
+    'compact_dtypes': False,
+    # Largest rounding error tolerated when narrowing a float column to float32
+    'float32_tolerance': 0.005
+}
+
+# Ingest validation (validation.py); failing rows are quarantined, not loaded
+VALIDATION_CONFIG = {
+    'enabled': True,
+    # Plausible (min, max) per column, inclusive
+    'ranges': {'price': (0.0, 50000.0), 'litres': (0.0, 1000.0), 'liter_price': (0.0, 100.0)},
+    # Quarantine exact repeats of an earlier row (same date, station, amounts and vehicle).
+    # Off by default: a double swipe is a real charge, so both copies stay loaded and the
+    # second is flagged as a possible duplicate swipe on the Business Intelligence page
+    'drop_duplicates': False,
+    # Quarantined rows listed on the Data Management page
+    'display_rows': 100
+}
+
+# Sidebar period choices besides a financial year
+FILTER_CONFIG = {
+    # "Last N days" ranges, counted back from the latest transaction
+    'recent_days': [30, 90, 365]
+}
+
+# Bounded in-process caches; policy is 'lru' or 'fifo'
+CACHE_CONFIG = {
+    'default': {'max_entries': 64, 'policy': 'lru'},
+    'analytics': {'max_entries': 256, 'policy': 'lru'},
+    # Built Plotly figures; each holds up to CHART_CONFIG['max_points'] points
+    'figures': {'max_entries': 64, 'policy': 'lru'},
+    # Sorted/searched row orders for the Data Management table
+    'table': {'max_entries': 32, 'policy': 'lru'},
+    # Filtered rows read from the SQLite store (DATA_CONFIG['store_path'])
+    'store': {'max_entries': 8, 'policy': 'lru'}
+}
+
+# Background warm-up of the caches above after a dataset loads; off unless PETROL_WARMUP=1
+WARMUP_CONFIG = {
+    'enabled': os.environ.get('PETROL_WARMUP', '').lower() in ('1', 'true', 'yes'),
+    'workers': 1,
+    # Months of the latest year warmed besides whole years and recent-day ranges
+    'latest_months': 3,
+    # Keep below CACHE_CONFIG['figures'] / 5 so warmed figures do not evict each other
+    'max_selections': 12,
+    'figures': True,
+    'group_forecasts': True
+}
+
+# Cold-start budget checked by `python startup.py --check`
+STARTUP_CONFIG = {
+    'entry_module': 'app',
+    'budget_seconds': 2.5,
+    # Modules that must stay out of cold start until a page needs them. Streamlit
+    # itself imports plotly and pyarrow, so our own charts module is checked instead.
+    'deferred_modules': ['charts', 'openpyxl', 'sklearn']
+}
+
+# Per-stage rerun timing; PETROL_PERF=1 turns it on, PETROL_PERF_LOG appends spans as JSON lines
+PERF_CONFIG = {
+    'enabled': os.environ.get('PETROL_PERF', '').lower() in ('1', 'true', 'yes'),
+    'panel': True,
+    'log_file': os.environ.get('PETROL_PERF_LOG') or None
+}
+
+# Resampled series (timeseries.py); windows and EWMA spans are counted in periods
+TIMESERIES_CONFIG = {
+    'windows': {'daily': 30, 'weekly': 8, 'monthly': 3},
+    'ewma_spans': {'daily': 14, 'weekly': 4, 'monthly': 3},
+    'chart_frequency': 'weekly'
+}
+
+# Per-station and per-vehicle forecasts (forecast.forecast_series)
+FORECAST_CONFIG = {
+    'frequency': 'weekly',
+    # Periods forecast ahead, and scored ahead of each backtest origin
+    'horizon': 8,
+    'models': ['linear', 'exponential', 'seasonal_naive'],
+    # Seasonal naive repeats the values of one season ago
+    'season_lengths': {'daily': 7, 'weekly': 52, 'monthly': 12},
+    # Rolling-origin backtest: the last origins periods each forecast horizon periods ahead
+    'backtest_origins': 12,
+    # Process pool size (None: one per CPU); series are only spread over a pool
+    # once there are enough of them to repay starting it
+    'workers': None,
+    'parallel_min_series': 2000
+}
+
+# Suspicious transaction detection (anomalies.py)
+ANOMALY_CONFIG = {
+    # Trailing rolling window, in transactions per station (price) or vehicle (litres)
+    'window': 30,
+    'min_periods': 8,
+    # Robust z-score beyond which a price or volume is flagged
+    'z_threshold': 4.0,
+    # Floor for the robust scale, as a fraction of the rolling median, so flat periods
+    # and the regular monthly fuel price adjustments are not flagged
+    'min_relative_scale': {'liter_price': 0.03, 'litres': 0.05},
+    'max_tank_litres': 120,
+    # Relative disagreement tolerated between price and litres x liter_price
+    'price_tolerance': 0.02,
+    # Same station, same day and a price within this many rand counts as a repeat swipe;
+    # exact repeats only get this far with VALIDATION_CONFIG['drop_duplicates'] off
+    'duplicate_price_tolerance': 0.01,
+    # Most anomalous rows listed on the Business Intelligence page
+    'display_rows': 100
+}
+
+TABLE_CONFIG = {
+    # Columns whose sort order is precomputed when the data is loaded
+    'sortable_columns': ['date', 'station', 'vehicle', 'price', 'litres', 'liter_price'],
+    'page_sizes': [25, 50, 100, 250],
+    'default_sort': 'date'
+}
+
 COLORS = {
     'primary': '#2E86AB',
     'secondary': '#A23B72', 
@@ -109,5 +241,10 @@ CHART_CONFIG = {
         'width': 4,
         'shape': 'spline',
         'smoothing': 1.3
-    }
+    },
+    # Time-series charts are reduced to this many points with LTTB (None disables it)
+    'max_points': 2000,
+    # Scatter traces drawing more points than this render through WebGL (Scattergl); with
+    # downsampling on that needs max_points above it
+    'webgl_threshold': 5000
 }
\ No newline at end of file
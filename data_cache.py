@@ -0,0 +1,114 @@
+"""
+Columnar on-disk snapshots of the normalised transaction frame.
+
+Parsing Spend.xlsx through openpyxl is by far the slowest part of a cold
+start, so the prepared frame is written next to a small JSON sidecar that
+records the size, mtime and content hash of the workbook it came from.
+"""
+
+import hashlib
+import json
+import os
+import pandas as pd
+from config import DATA_CONFIG
+
+SNAPSHOT_VERSION = 2
+
+def _snapshot_paths(source):
+    """Return the (data, metadata) paths of the snapshot for a source file."""
+    source = os.path.abspath(source)
+    stem = os.path.splitext(os.path.basename(source))[0]
+    key = hashlib.sha1(source.encode('utf-8')).hexdigest()[:10]
+    base = os.path.join(DATA_CONFIG['cache_dir'], f"{stem}-{key}")
+    return base + '.parquet', base + '.json'
+
+def file_hash(path, chunk_size=1 << 20):
+    """Content hash of a file, read in fixed-size chunks."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def source_fingerprint(path):
+    """Size, mtime and content hash identifying one version of a source file."""
+    stat = os.stat(path)
+    return {
+        'version': SNAPSHOT_VERSION,
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'hash': file_hash(path)
+    }
+
+def _write_json(path, payload):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(payload, f)
+    os.replace(tmp_path, path)
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def load_snapshot(source):
+    """Return (frame, metadata) of the last snapshot for source, valid or not."""
+    data_path, meta_path = _snapshot_paths(source)
+    meta = _read_meta(meta_path)
+    if meta is None or meta.get('version') != SNAPSHOT_VERSION:
+        return None, None
+    try:
+        return pd.read_parquet(data_path), meta
+    except Exception:
+        return None, None
+
+def read_snapshot(source):
+    """Return the cached frame for source, or None if it is missing or stale."""
+    data_path, meta_path = _snapshot_paths(source)
+    meta = _read_meta(meta_path)
+    try:
+        stat = os.stat(source)
+    except OSError:
+        return None
+
+    if meta is None or meta.get('version') != SNAPSHOT_VERSION or meta.get('size') != stat.st_size:
+        return None
+
+    # A touched but unchanged workbook only costs a re-hash, not a re-parse
+    if meta.get('mtime_ns') != stat.st_mtime_ns:
+        if meta.get('hash') != file_hash(source):
+            return None
+        meta['mtime_ns'] = stat.st_mtime_ns
+        _write_json(meta_path, meta)
+
+    try:
+        return pd.read_parquet(data_path)
+    except Exception:
+        return None
+
+def write_snapshot(df, source, fingerprint=None):
+    """Persist df as the snapshot for source; failures leave no snapshot behind."""
+    data_path, meta_path = _snapshot_paths(source)
+    if fingerprint is None:
+        fingerprint = source_fingerprint(source)
+
+    try:
+        os.makedirs(os.path.dirname(data_path), exist_ok=True)
+        tmp_path = data_path + '.tmp'
+        df.to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, data_path)
+        _write_json(meta_path, fingerprint)
+        return True
+    except Exception:
+        clear_snapshot(source)
+        return False
+
+def clear_snapshot(source):
+    """Remove any snapshot stored for source."""
+    for path in _snapshot_paths(source):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,167 @@
+"""
+Registry of loaded datasets and the structures precomputed for them.
+
+Frames returned by st.cache_data are fresh copies on every rerun, and
+DataFrame.attrs is deep-copied by most pandas operations, so heavy
+structures such as the filter index and rollup cube are not stored on the
+frame. Instead the loaded frame carries a short dataset id in attrs and the
+structures live in a small process-wide registry under that id.
+
+filter_data stamps its results as views: the dataset id, the filter
+criteria and the row count. A frame only counts as the registered dataset
+or one of its views while its length still matches, so derived frames fall
+back to scanning their own rows.
+
+Frames read from a SQLite TransactionStore are stamped the same way with
+the store path instead of a dataset id; their aggregates run as SQL.
+"""
+
+import uuid
+from collections import OrderedDict
+from config import TABLE_CONFIG
+from filter_index import DATE_KEYS, FilterIndex, sort_permutation
+from rollup import RollupCube, DIMENSIONS, MEASURES
+from aggregate import fused_summary
+from store import TransactionStore, plain_value
+
+MAX_DATASETS = 4
+
+_registry = OrderedDict()
+
+class Dataset:
+    """A loaded frame's filter index, rollup cube, table sort orders and quarantined rows."""
+
+    def __init__(self, df, quarantine=None):
+        self.id = uuid.uuid4().hex
+        self.quarantine = quarantine
+        self.n_rows = len(df)
+        self.index = FilterIndex(df)
+        self.cube = RollupCube(df) if any(column in df.columns for column in DIMENSIONS) else None
+        self.sort_orders = {
+            column: sort_permutation(df[column])
+            for column in TABLE_CONFIG['sortable_columns'] if column in df.columns
+        }
+
+def register_dataset(df, quarantine=None):
+    """Build the index and cube for df and stamp it with their dataset id.
+
+    quarantine, the rows validation rejected while loading df, is kept
+    alongside for the Data Management page.
+    """
+    dataset = Dataset(df, quarantine)
+    _registry[dataset.id] = dataset
+    while len(_registry) > MAX_DATASETS:
+        _registry.popitem(last=False)
+    df.attrs['dataset_id'] = dataset.id
+    return df
+
+def get_dataset(df):
+    """Return the registered dataset df belongs to, if it is still registered."""
+    dataset = _registry.get(df.attrs.get('dataset_id'))
+    if dataset is not None:
+        _registry.move_to_end(dataset.id)
+    return dataset
+
+def is_full_frame(df):
+    """The registered dataset whose index describes df exactly, or None."""
+    dataset = get_dataset(df)
+    if dataset is None or 'filters' in df.attrs or not dataset.index.describes(df):
+        return None
+    return dataset
+
+def stamp_view(view, dataset, criteria):
+    """Record that view holds exactly the rows of dataset matching criteria."""
+    view.attrs['dataset_id'] = dataset.id
+    # pyarrow records attrs as JSON when st.dataframe converts a view, and warns on NumPy scalars
+    view.attrs['filters'] = {column: plain_value(value) for column, value in criteria.items()}
+    view.attrs['rows'] = len(view)
+    return view
+
+def clear_view(df):
+    """Drop any dataset stamp from a derived frame."""
+    for key in ('dataset_id', 'store', 'store_version', 'filters', 'rows'):
+        df.attrs.pop(key, None)
+    return df
+
+def view_of(df):
+    """Return (dataset, criteria) if df is a registered dataset or an untouched view of one."""
+    dataset = get_dataset(df)
+    if dataset is None or len(df) != df.attrs.get('rows', dataset.n_rows):
+        return None, None
+    return dataset, df.attrs.get('filters', {})
+
+def store_view(df):
+    """Return (store, criteria) if df holds untouched rows read from a TransactionStore."""
+    path = df.attrs.get('store')
+    if path is None or len(df) != df.attrs.get('rows'):
+        return None, None
+    return TransactionStore(path), df.attrs.get('filters', {})
+
+def view_key(df):
+    """Hashable (dataset id, criteria) identifying df, or None for unregistered frames."""
+    store, criteria = store_view(df)
+    if store is not None:
+        return ('store', store.path, df.attrs.get('store_version')), tuple(sorted(criteria.items()))
+    dataset, criteria = view_of(df)
+    if dataset is None:
+        return None
+    return dataset.id, tuple(sorted(criteria.items()))
+
+def cube_cells(df):
+    """Return (cube, cells) answering aggregate queries for df, or (None, None).
+
+    Date ranges cut across the cube's monthly cells, so views selected by
+    one are aggregated from their rows instead.
+    """
+    dataset, criteria = view_of(df)
+    if dataset is None or dataset.cube is None or any(key in criteria for key in DATE_KEYS):
+        return None, None
+    return dataset.cube, dataset.cube.select(**criteria)
+
+def summarise(df):
+    """Totals, means, spreads, extremes, date span and per-station spend of df.
+
+    The result is a dict with 'rows', a stats dict (sum, count, mean, std,
+    min, max) per measure column, 'date_min'/'date_max' and 'by_station'.
+    It is served from the rollup cube when df is a registered dataset or one
+    of its views, in SQL for rows read from a store, otherwise computed in
+    one fused pass over the rows.
+    """
+    store, criteria = store_view(df)
+    if store is not None:
+        return store.summary(criteria)
+    cube, cells = cube_cells(df)
+    if cube is not None:
+        return cube.totals(cells)
+    return fused_summary(df)
+
+def breakdown(df, by, measure='price'):
+    """Sum of measure grouped by the given columns, from the cube or store when possible."""
+    store, criteria = store_view(df)
+    if store is not None and measure in store.columns and store.aggregates(by):
+        return store.breakdown(criteria, by, measure)
+    cube, cells = cube_cells(df)
+    if cube is not None and measure in cube.measures and all(column in cube.dimensions for column in by):
+        return cube.breakdown(cells, by, measure).rename(measure)
+    return df.groupby(by, observed=True)[measure].sum()
+
+def group_summary(df, by):
+    """Row count and per-measure sum, count and mean for each group of df[by].
+
+    Columns are 'rows' and '<measure>_sum', '<measure>_count', '<measure>_mean',
+    served from the cube or store when every grouping column is one of its
+    dimensions.
+    """
+    store, criteria = store_view(df)
+    if store is not None and store.aggregates(by):
+        return store.group_totals(criteria, by)
+    cube, cells = cube_cells(df)
+    if cube is not None and all(column in cube.dimensions for column in by):
+        return cube.group_totals(cells, by)
+
+    measures = [column for column in MEASURES if column in df.columns]
+    grouped = df.groupby(by, observed=True)
+    table = grouped[measures].agg(['sum', 'count', 'mean'])
+    table.columns = [f"{column}_{stat}" for column, stat in table.columns]
+    table.insert(0, 'rows', grouped.size())
+    return table
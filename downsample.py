@@ -0,0 +1,53 @@
+"""
+Server-side downsampling for time-series charts.
+
+Largest-Triangle-Three-Buckets keeps the points that contribute most to the
+visual shape of a line, so a chart with a few thousand points looks like the
+full series while sending a fraction of the data to the browser. The global
+minimum and maximum are always kept on top of the LTTB selection.
+"""
+
+import numpy as np
+
+def lttb(x, y, threshold):
+    """Return sorted indices of the points kept when reducing (x, y) to threshold points.
+
+    x must be ascending and y free of NaN. Series at or below the threshold
+    are returned whole.
+    """
+    n = len(y)
+    if threshold is None or threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+
+    # threshold - 2 buckets over the interior points; first and last are always kept
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.intp)
+    selected = np.empty(threshold, dtype=np.intp)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = n - 1, n
+        avg_x = x[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+
+        areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(areas.argmax())
+        selected[bucket + 1] = a
+
+    return selected
+
+def downsample_indices(x, y, max_points):
+    """LTTB indices for a chart, with the global extremes of y always included."""
+    indices = lttb(x, y, max_points)
+    if len(indices) == len(y) or not len(y):
+        return indices
+    extremes = np.array([np.argmin(y), np.argmax(y)], dtype=np.intp)
+    return np.union1d(indices, extremes)
@@ -0,0 +1,263 @@
+"""
+Streaming reader for large Spend workbooks.
+
+pd.read_excel materialises every cell as a Python object before building the
+frame, so peak memory is several times the final DataFrame. This reader walks
+each sheet in read-only row batches and coerces every batch straight into
+typed NumPy buffers, keeping only one batch of Python objects alive at a time.
+Cells of typed columns that fail to coerce are recorded in a 'parse_errors'
+bitmask column (see validation.PARSE_ERROR_BITS) rather than silently
+becoming NaN or NaT. A column whose type was only inferred from its first
+batch becomes a text column when a later batch does not fit, as it would
+have been had the mixed cells come first, so no value is lost.
+"""
+
+import hashlib
+from datetime import date, datetime
+from numbers import Number
+import numpy as np
+import pandas as pd
+from validation import PARSE_ERROR_BITS
+
+# Columns with a known type; others are inferred from their first batch (see _ColumnBuffer.append)
+COLUMN_TYPES = {
+    'date': 'datetime',
+    'price': 'float',
+    'litres': 'float',
+    'liter_price': 'float'
+}
+
+DEFAULT_BATCH_SIZE = 50000
+
+def normalise_column(name):
+    """Normalise a header cell the same way prepare_data does."""
+    return str(name).strip().lower().replace(' ', '_')
+
+class _ColumnBuffer:
+    """Growable typed buffer for one output column."""
+
+    def __init__(self, kind, capacity, inferred=False):
+        self.kind = kind
+        self.inferred = inferred
+        self.size = 0
+        # Cells that were present but did not coerce, for typed columns
+        self.failed = np.zeros(capacity, dtype=bool) if kind in ('float', 'datetime') else None
+        if kind == 'float':
+            self.values = np.empty(capacity, dtype=np.float64)
+        elif kind == 'datetime':
+            self.values = np.empty(capacity, dtype=np.int64)
+        else:
+            self.values = np.empty(capacity, dtype=np.int32)
+            self.categories = {}
+
+    def _reserve(self, extra):
+        needed = self.size + extra
+        if needed > len(self.values):
+            grown = np.empty(max(needed, 2 * len(self.values)), dtype=self.values.dtype)
+            grown[:self.size] = self.values[:self.size]
+            self.values = grown
+            if self.failed is not None:
+                failed = np.zeros(len(grown), dtype=bool)
+                failed[:self.size] = self.failed[:self.size]
+                self.failed = failed
+
+    def _coerce(self, cells):
+        """Typed values of cells, and which present cells failed to coerce (None for text)."""
+        series = pd.Series(cells, dtype=object)
+        if self.kind == 'float':
+            values = pd.to_numeric(series, errors='coerce')
+            return values.to_numpy(dtype=np.float64), (values.isna() & series.notna()).to_numpy()
+        if self.kind == 'datetime':
+            dates = pd.to_datetime(series, errors='coerce').astype('datetime64[ns]')
+            return dates.to_numpy().view(np.int64), (dates.isna() & series.notna()).to_numpy()
+
+        codes, uniques = pd.factorize(series.where(series.isna(), series.astype(str)))
+        lookup = np.array([self.categories.setdefault(u, len(self.categories)) for u in uniques] + [-1], dtype=np.int32)
+        return lookup[codes], None
+
+    def _to_text(self):
+        """Re-encode the values read so far as text codes, as str() of the cells they came from."""
+        read = self.finish()
+        if self.kind == 'float':
+            # Excel integers were read as floats; str(12) is '12', not '12.0'
+            cells = [None if np.isnan(v) else str(int(v)) if v.is_integer() else str(v) for v in read.tolist()]
+        else:
+            cells = [None if pd.isna(v) else str(v) for v in pd.Series(read).tolist()]
+        self.kind, self.failed, self.categories = 'text', None, {}
+        self.values = np.empty(len(self.values), dtype=np.int32)
+        self.values[:self.size] = self._coerce(cells)[0]
+
+    def append(self, cells):
+        self._reserve(len(cells))
+        values, failed = self._coerce(cells)
+        if self.inferred and failed is not None and failed.any():
+            # The first batch's type does not fit this one; keep every value as text
+            self._to_text()
+            values, failed = self._coerce(cells)
+        self.values[self.size:self.size + len(cells)] = values
+        if failed is not None:
+            self.failed[self.size:self.size + len(cells)] = failed
+        self.size += len(cells)
+
+    def pad(self, count):
+        """Append count missing values (for columns absent from a sheet)."""
+        self._reserve(count)
+        missing = {'float': np.nan, 'datetime': np.iinfo(np.int64).min, 'text': -1}[self.kind]
+        self.values[self.size:self.size + count] = missing
+        if self.failed is not None:
+            self.failed[self.size:self.size + count] = False
+        self.size += count
+
+    def finish(self):
+        values = self.values[:self.size]
+        if self.kind == 'float':
+            return values
+        if self.kind == 'datetime':
+            return values.view('datetime64[ns]')
+        categories = np.empty(len(self.categories), dtype=object)
+        categories[:] = list(self.categories)
+        # Text columns come back as plain object strings, matching pd.read_excel
+        return pd.Categorical.from_codes(values, categories=categories).astype(object)
+
+def _infer_kind(column, cells):
+    """Pick a buffer type for a column from its first batch of cells."""
+    if column in COLUMN_TYPES:
+        return COLUMN_TYPES[column]
+    present = [cell for cell in cells if cell is not None]
+    if present and all(isinstance(cell, Number) and not isinstance(cell, bool) for cell in present):
+        return 'float'
+    if present and all(isinstance(cell, (date, datetime)) for cell in present):
+        return 'datetime'
+    return 'text'
+
+class RowChecksum:
+    """Running hash over the raw cell values of every data row read.
+
+    The digest is also captured once `boundary` rows have been hashed, so an
+    incremental refresh can check that the rows it already holds are still
+    the first rows of the workbook.
+    """
+
+    def __init__(self, boundary=0):
+        self.boundary = boundary
+        self.rows = 0
+        self.prefix = None
+        self._digest = hashlib.blake2b(digest_size=20)
+
+    def update(self, row):
+        if self.rows == self.boundary:
+            self.prefix = self._digest.hexdigest()
+        self._digest.update(repr(row).encode('utf-8'))
+        self.rows += 1
+
+    def finish(self):
+        """Return the digest of all rows seen so far."""
+        if self.rows == self.boundary:
+            self.prefix = self._digest.hexdigest()
+        return self._digest.hexdigest()
+
+def _sheet_rows(sheet):
+    """Return (header, row iterator) for a read-only worksheet."""
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return [], iter(())
+
+    # Trailing unnamed header cells are formatting noise, not columns
+    while header and header[-1] is None:
+        header = header[:-1]
+    header = [normalise_column(name) for name in header]
+    width = len(header)
+
+    def clean_rows():
+        for row in rows:
+            row = row[:width]
+            if all(cell is None for cell in row):
+                continue
+            if len(row) < width:
+                row = row + (None,) * (width - len(row))
+            yield row
+
+    return header, clean_rows()
+
+class _FrameBuilder:
+    """Collects row batches into per-column buffers."""
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.buffers = {}
+        self.total = 0
+
+    def add(self, header, batch):
+        cells = list(zip(*batch))
+        for position, column in enumerate(header):
+            if column not in self.buffers:
+                self.buffers[column] = _ColumnBuffer(_infer_kind(column, cells[position]), self.capacity,
+                                                     inferred=column not in COLUMN_TYPES)
+                self.buffers[column].pad(self.total)
+
+        seen = set()
+        for position, column in enumerate(header):
+            # Duplicate headers keep the first occurrence, as the rest would collide
+            if column in seen:
+                continue
+            seen.add(column)
+            self.buffers[column].append(cells[position])
+        for column, buffer in self.buffers.items():
+            if column not in seen:
+                buffer.pad(len(batch))
+
+        self.total += len(batch)
+
+    def finish(self):
+        df = pd.DataFrame({column: buffer.finish() for column, buffer in self.buffers.items()})
+        parse_errors = np.zeros(self.total, dtype=np.uint8)
+        for column, buffer in self.buffers.items():
+            if column in PARSE_ERROR_BITS and buffer.failed is not None:
+                parse_errors[buffer.failed[:buffer.size]] |= PARSE_ERROR_BITS[column]
+        df['parse_errors'] = parse_errors
+        return df
+
+def read_workbook(path, sheets=None, batch_size=DEFAULT_BATCH_SIZE, skip_rows=0, checksum=None):
+    """Stream one or more sheets of a workbook into a single typed DataFrame.
+
+    sheets may be None (first sheet only, like pd.read_excel), 'all', or a
+    list of sheet names. Sheets are stacked; columns missing from a sheet are
+    left empty for its rows. The first skip_rows data rows are not decoded,
+    but are still fed to checksum (a RowChecksum) when one is given.
+    """
+    # openpyxl is only needed on a snapshot miss, so keep it out of cold start
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        if sheets is None:
+            names = workbook.sheetnames[:1]
+        elif sheets == 'all':
+            names = workbook.sheetnames
+        else:
+            names = list(sheets)
+
+        capacity = sum(max((workbook[name].max_row or 1) - 1, 0) for name in names) - skip_rows
+        builder = _FrameBuilder(max(capacity, 0) or batch_size)
+
+        skipped = 0
+        for name in names:
+            header, rows = _sheet_rows(workbook[name])
+            batch = []
+            for row in rows:
+                if checksum is not None:
+                    checksum.update(row)
+                if skipped < skip_rows:
+                    skipped += 1
+                    continue
+                batch.append(row)
+                if len(batch) >= batch_size:
+                    builder.add(header, batch)
+                    batch = []
+            if batch:
+                builder.add(header, batch)
+    finally:
+        workbook.close()
+
+    return builder.finish()
@@ -0,0 +1,74 @@
+"""
+Chunked file exports for the Data Management page.
+
+Each export is written to an in-memory buffer a slice of rows at a time, so
+the full text of a large frame never exists as one Python string next to its
+encoded bytes. data_page passes these writers to st.download_button as
+callables, so nothing is generated until a download is actually requested.
+"""
+
+import gzip
+import io
+from functools import partial
+
+EXPORT_CHUNK_ROWS = 50000
+
+def _chunks(df, chunk_rows):
+    for start in range(0, len(df), chunk_rows):
+        yield start, df.iloc[start:start + chunk_rows]
+
+def write_csv(df, stream, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write df as CSV text to a binary stream."""
+    if df.empty:
+        stream.write(df.to_csv(index=False).encode('utf-8'))
+        return
+    for start, chunk in _chunks(df, chunk_rows):
+        stream.write(chunk.to_csv(index=False, header=start == 0).encode('utf-8'))
+
+def write_json(df, stream, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write df as one JSON array of records, matching to_json(orient='records')."""
+    stream.write(b'[')
+    for start, chunk in _chunks(df, chunk_rows):
+        if start:
+            stream.write(b',')
+        stream.write(chunk.to_json(orient='records', date_format='iso')[1:-1].encode('utf-8'))
+    stream.write(b']')
+
+def write_ndjson(df, stream, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write df as newline-delimited JSON, one record per line."""
+    for _, chunk in _chunks(df, chunk_rows):
+        lines = chunk.to_json(orient='records', date_format='iso', lines=True)
+        if not lines.endswith('\n'):
+            lines += '\n'
+        stream.write(lines.encode('utf-8'))
+
+def write_parquet(df, stream, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Write df as Parquet with one row group per chunk."""
+    # Dataset stamps in attrs are internal and not always JSON serialisable
+    df = df.copy(deep=False)
+    df.attrs = {}
+    df.to_parquet(stream, index=False, row_group_size=chunk_rows)
+
+EXPORT_FORMATS = {
+    'csv': {'label': '📊 Download CSV', 'extension': 'csv', 'mime': 'text/csv', 'writer': write_csv},
+    'csv_gz': {'label': '🗜️ Download CSV (gzip)', 'extension': 'csv.gz', 'mime': 'application/gzip', 'writer': write_csv, 'gzip': True},
+    'json': {'label': '📋 Download JSON', 'extension': 'json', 'mime': 'application/json', 'writer': write_json},
+    'ndjson': {'label': '📜 Download NDJSON', 'extension': 'ndjson', 'mime': 'application/x-ndjson', 'writer': write_ndjson},
+    'parquet': {'label': '📦 Download Parquet', 'extension': 'parquet', 'mime': 'application/vnd.apache.parquet', 'writer': write_parquet}
+}
+
+def export_file(df, fmt, chunk_rows=EXPORT_CHUNK_ROWS):
+    """Return a rewound BytesIO holding df in the given export format."""
+    spec = EXPORT_FORMATS[fmt]
+    buffer = io.BytesIO()
+    if spec.get('gzip'):
+        with gzip.GzipFile(fileobj=buffer, mode='wb', compresslevel=6, mtime=0) as compressed:
+            spec['writer'](df, compressed, chunk_rows)
+    else:
+        spec['writer'](df, buffer, chunk_rows)
+    buffer.seek(0)
+    return buffer
+
+def deferred_export(df, fmt):
+    """Zero-argument callable producing the export, for st.download_button(data=...)."""
+    return partial(export_file, df, fmt)
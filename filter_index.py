@@ -0,0 +1,118 @@
+"""
+Precomputed row-position index for the sidebar filters.
+
+The index maps every year, month name, station and vehicle to the sorted row
+positions holding it, so a filter is an intersection of a few small arrays
+followed by a single take instead of a copy and several full-column scans.
+Indexes are built once per loaded frame and held by the datasets registry,
+together with precomputed sort permutations for the Data Management table.
+
+Loaded frames are kept in date order, so a date range is two searchsorted
+calls giving a contiguous slice of rows, and within the sorted positions of
+any other filter value it is the same two calls again.
+"""
+
+import numpy as np
+import pandas as pd
+
+INDEX_COLUMNS = ('year', 'month_name', 'station', 'vehicle')
+# Inclusive ISO date bounds accepted by positions() alongside column criteria
+DATE_KEYS = ('date_from', 'date_to')
+
+class FilterIndex:
+    """Sorted position arrays for each value of the filterable columns."""
+
+    def __init__(self, df):
+        self.n_rows = len(df)
+        self.groups = {
+            column: self._group_positions(df[column].to_numpy())
+            for column in INDEX_COLUMNS if column in df.columns
+        }
+        self.dates = df['date'].to_numpy(dtype='datetime64[ns]') if 'date' in df.columns else None
+        self.dates_sorted = self.dates is not None and is_date_sorted(self.dates)
+        # Undated rows sort last, so the dated ones are a prefix
+        self.n_dated = int((~np.isnat(self.dates)).sum()) if self.dates is not None else 0
+
+    @staticmethod
+    def _group_positions(values):
+        codes, uniques = pd.factorize(values)
+        order = np.argsort(codes, kind='stable')
+        missing = int((codes < 0).sum())
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques))
+        splits = np.split(order[missing:], np.cumsum(counts)[:-1]) if len(uniques) else []
+        return dict(zip(uniques.tolist(), splits))
+
+    def describes(self, df):
+        """True if df still has the row layout this index was built for."""
+        index = df.index
+        return (
+            len(df) == self.n_rows
+            and isinstance(index, pd.RangeIndex)
+            and index.start == 0 and index.step == 1
+        )
+
+    def date_positions(self, date_from=None, date_to=None):
+        """Rows dated from date_from to date_to inclusive (ISO dates; None is open-ended).
+
+        A slice when the frame is date-sorted, otherwise sorted positions.
+        """
+        start = np.datetime64(date_from, 'D').astype('datetime64[ns]') if date_from else None
+        end = (np.datetime64(date_to, 'D') + 1).astype('datetime64[ns]') if date_to else None
+        if self.dates_sorted:
+            dated = self.dates[:self.n_dated]
+            return slice(
+                int(np.searchsorted(dated, start, 'left')) if start is not None else 0,
+                int(np.searchsorted(dated, end, 'left')) if end is not None else self.n_dated
+            )
+        mask = ~np.isnat(self.dates)
+        if start is not None:
+            mask &= self.dates >= start
+        if end is not None:
+            mask &= self.dates < end
+        return np.flatnonzero(mask)
+
+    def positions(self, **criteria):
+        """Row positions matching every column=value pair, or None for no criteria.
+
+        A date range (DATE_KEYS) on its own gives a slice; combined with other
+        criteria it narrows their sorted positions.
+        """
+        date_range = {key: criteria.pop(key) for key in DATE_KEYS if key in criteria}
+        result = self._intersection(criteria)
+        if not date_range:
+            return result
+
+        rows = self.date_positions(**date_range)
+        if result is None:
+            return rows
+        if isinstance(rows, slice):
+            return result[np.searchsorted(result, rows.start):np.searchsorted(result, rows.stop)]
+        return np.intersect1d(result, rows, assume_unique=True)
+
+    def _intersection(self, criteria):
+        selected = []
+        for column, value in criteria.items():
+            selected.append(self.groups[column].get(value, np.empty(0, dtype=np.intp)))
+        if not selected:
+            return None
+
+        selected.sort(key=len)
+        result = selected[0]
+        for positions in selected[1:]:
+            if not len(result):
+                break
+            result = np.intersect1d(result, positions, assume_unique=True)
+        return result
+
+def is_date_sorted(dates):
+    """True if datetime64 values ascend with any missing values at the end."""
+    missing = np.isnat(dates)
+    n_dated = len(dates) - int(missing.sum())
+    return not missing[:n_dated].any() and bool((dates[1:n_dated] >= dates[:n_dated - 1]).all())
+
+def sort_permutation(values):
+    """Stable ascending row order of values, with missing values last."""
+    codes, _ = pd.factorize(values, sort=True)
+    codes = np.where(codes < 0, len(values), codes)
+    order = np.argsort(codes, kind='stable')
+    return order.astype(np.int32) if len(values) < np.iinfo(np.int32).max else order
@@ -0,0 +1,89 @@
+"""
+Fleet mode: one workbook per vehicle, loaded in parallel into one frame.
+
+Every workbook in the fleet directory is read (through its own snapshot) in
+a process pool, so load time grows with the slowest share of files per core
+rather than with the file count. Rows are tagged with a 'vehicle' column
+taken from the file name, which the filter index and rollup cube treat like
+any other dimension.
+"""
+
+import os
+import pandas as pd
+from config import DATA_CONFIG
+from analytics import read_petrol_data, compact_frame, sort_by_date, source_version
+from datasets import group_summary
+from pools import spawn_pool
+from validation import validate
+
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xlsm', '.xls')
+
+def discover_workbooks(directory):
+    """Workbooks directly inside directory, sorted by name, skipping Excel lock files."""
+    return sorted(
+        os.path.join(directory, name) for name in os.listdir(directory)
+        if name.lower().endswith(WORKBOOK_EXTENSIONS) and not name.startswith('~$')
+    )
+
+def vehicle_id(path):
+    """Vehicle identifier for a workbook: its file name without extension."""
+    return os.path.splitext(os.path.basename(path))[0]
+
+def fleet_version(directory):
+    """Token that changes when any fleet workbook is added, removed or saved."""
+    return tuple((path, source_version(path)) for path in discover_workbooks(directory))
+
+def _read_vehicle(path, use_snapshot):
+    try:
+        return path, read_petrol_data(path, use_snapshot=use_snapshot), None
+    except Exception as e:
+        return path, None, f"{type(e).__name__}: {e}"
+
+def load_fleet(directory, workers=DATA_CONFIG['fleet_workers'], use_snapshot=DATA_CONFIG['snapshot_enabled'],
+               compact=DATA_CONFIG['compact_dtypes']):
+    """Load every workbook in directory into one frame with a 'vehicle' column.
+
+    Returns (frame, errors, quarantine): the validated rows in date order,
+    a mapping of each unreadable workbook to its error message (the
+    remaining vehicles are still loaded), and the rows validation rejected.
+    """
+    paths = discover_workbooks(directory)
+    workers = min(workers or os.cpu_count() or 1, len(paths)) or 1
+
+    if workers == 1:
+        results = [_read_vehicle(path, use_snapshot) for path in paths]
+    else:
+        with spawn_pool(workers) as pool:
+            results = list(pool.map(_read_vehicle, paths, [use_snapshot] * len(paths)))
+
+    # Each workbook is validated on its own, so a quarantined row's 'row' and
+    # 'vehicle' locate it in its source file
+    frames, quarantines, errors = [], [], {}
+    for path, df, error in results:
+        if error is not None:
+            errors[path] = error
+        else:
+            clean, quarantine = validate(df.assign(vehicle=vehicle_id(path)))
+            frames.append(clean)
+            quarantines.append(quarantine)
+
+    if not frames:
+        return pd.DataFrame(), errors, pd.DataFrame()
+    df = sort_by_date(pd.concat(frames, ignore_index=True))
+    quarantine = pd.concat(quarantines, ignore_index=True)
+    if compact and len(df):
+        df = compact_frame(df)
+    return df, errors, quarantine
+
+def vehicle_summary(df):
+    """Fleet-level table of visits, spend, litres and average price per litre by vehicle."""
+    table = group_summary(df, ['vehicle'])
+    summary = pd.DataFrame({'visits': table['rows']}, index=table.index)
+    if 'price_sum' in table.columns:
+        summary['total_spent'] = table['price_sum']
+        summary['spend_share_pct'] = table['price_sum'] / table['price_sum'].sum() * 100
+    if 'litres_sum' in table.columns:
+        summary['total_litres'] = table['litres_sum']
+    if 'liter_price_mean' in table.columns:
+        summary['avg_price_per_litre'] = table['liter_price_mean']
+    return summary.sort_values('total_spent' if 'total_spent' in summary.columns else 'visits', ascending=False)
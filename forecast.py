@@ -0,0 +1,246 @@
+"""
+Closed-form least-squares trend forecasting.
+
+A univariate linear trend has an exact solution from a handful of sums, so
+there is no need to import and fit scikit-learn's LinearRegression. The sums
+are taken with np.bincount, which fits any number of series (one per
+station, vehicle, ...) in the same few vectorised passes.
+
+forecast_series does the same for per-period totals of many series at once,
+with a choice of models (linear trend, exponential smoothing, seasonal
+naive). The series are laid out as the rows of one period matrix, and every
+model is expressed as a forecast from each origin (the periods seen so far),
+computed for all origins in one pass: cumulative sums for the expanding
+linear fit, the EWMA level for smoothing, and a lagged column lookup for
+seasonal naive. A rolling-origin backtest therefore costs no more than a
+single forecast.
+"""
+
+import os
+import numpy as np
+import pandas as pd
+from config import FORECAST_CONFIG, TIMESERIES_CONFIG
+from pools import spawn_pool
+from timeseries import period_ordinals, period_starts
+
+MODELS = ('linear', 'exponential', 'seasonal_naive')
+
+NS_PER_DAY = 86_400_000_000_000
+
+def fit_trends(codes, x, y, n_groups):
+    """Fit y = intercept + slope * x for every group code at once.
+
+    Returns (slope, intercept, count) arrays of length n_groups. Groups whose
+    x values are all equal get a flat line through their mean, as
+    LinearRegression would; empty groups get NaN.
+    """
+    counts = np.bincount(codes, minlength=n_groups)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean_x = np.bincount(codes, weights=x, minlength=n_groups) / counts
+        mean_y = np.bincount(codes, weights=y, minlength=n_groups) / counts
+        dx = x - mean_x[codes]
+        sxx = np.bincount(codes, weights=dx * dx, minlength=n_groups)
+        sxy = np.bincount(codes, weights=dx * (y - mean_y[codes]), minlength=n_groups)
+        slope = np.where(sxx > 0, sxy / sxx, 0.0)
+    intercept = mean_y - slope * mean_x
+    return slope, intercept, counts
+
+def _days_since_start(dates, codes, n_groups):
+    """Whole days elapsed since each group's first date, plus per-group first/last dates."""
+    ns = dates.astype('datetime64[ns]').view(np.int64)
+    first = np.full(n_groups, np.iinfo(np.int64).max)
+    last = np.full(n_groups, np.iinfo(np.int64).min)
+    np.minimum.at(first, codes, ns)
+    np.maximum.at(last, codes, ns)
+    return (ns - first[codes]) // NS_PER_DAY, first, last
+
+def forecast_groups(dates, values, codes, n_groups, days_ahead=30, min_points=3):
+    """Project each group's linear trend days_ahead days past its last date.
+
+    Returns (group, date, predicted) arrays laid out group by group, with
+    predictions floored at zero. Groups with fewer than min_points
+    observations are skipped.
+    """
+    days, first, last = _days_since_start(dates, codes, n_groups)
+    slope, intercept, counts = fit_trends(codes, days.astype(np.float64), values.astype(np.float64), n_groups)
+
+    groups = np.flatnonzero(counts >= min_points)
+    last_day = (last[groups] - first[groups]) // NS_PER_DAY
+    steps = np.arange(1, days_ahead + 1)
+
+    group = np.repeat(groups, days_ahead)
+    future_day = (np.repeat(last_day, days_ahead) + np.tile(steps, len(groups))).astype(np.float64)
+    predicted = np.maximum(intercept[group] + slope[group] * future_day, 0)
+    future_ns = np.repeat(last[groups], days_ahead) + np.tile(steps, len(groups)) * NS_PER_DAY
+    return group, future_ns.view('datetime64[ns]'), predicted
+
+def linear_forecast(dates, values, days_ahead=30):
+    """Forecast one series; returns a frame with 'date' and 'predicted_price'."""
+    dates = pd.to_datetime(dates, cache=False).to_numpy(dtype='datetime64[ns]')
+    values = np.asarray(values, dtype=np.float64)
+    codes = np.zeros(len(dates), dtype=np.intp)
+    _, future_dates, predicted = forecast_groups(dates, values, codes, 1, days_ahead, min_points=1)
+    return pd.DataFrame({'date': future_dates, 'predicted_price': predicted})
+
+def batch_linear_forecast(df, by, value='price', days_ahead=30, min_points=3):
+    """Forecast value for every group of df[by] in one batch.
+
+    Returns a long frame with the group columns, 'date' and 'predicted_price'.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    data = df.dropna(subset=['date', value] + by)
+    grouped = data.groupby(by, observed=True, sort=True)
+    codes = grouped.ngroup().to_numpy()
+    keys = grouped.size().index
+
+    group, future_dates, predicted = forecast_groups(
+        data['date'].to_numpy(dtype='datetime64[ns]'), data[value].to_numpy(dtype=np.float64),
+        codes, len(keys), days_ahead, min_points
+    )
+    result = keys.take(group).to_frame(index=False) if len(keys) else pd.DataFrame(columns=by)
+    result['date'] = future_dates
+    result['predicted_price'] = predicted
+    return result
+
+def period_matrix(df, by, value='price', frequency='weekly'):
+    """Per-period totals of value for every group of df[by].
+
+    Returns (keys, periods, matrix): the group keys, the period starts and a
+    matrix with one row per group and one column per period between the
+    first and last dated row. Periods before a group's first row are NaN;
+    later periods without rows total zero.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    data = df.dropna(subset=['date', value] + by)
+    grouped = data.groupby(by, observed=True, sort=True)
+    codes = grouped.ngroup().to_numpy()
+    keys = grouped.size().index
+    if data.empty:
+        return keys, pd.DatetimeIndex([], name='period'), np.empty((0, 0))
+
+    ordinals = period_ordinals(data['date'].to_numpy(dtype='datetime64[ns]'), frequency)
+    first = int(ordinals.min())
+    columns = ordinals - first
+    n_periods = int(columns.max()) + 1
+
+    matrix = np.bincount(codes * n_periods + columns, weights=data[value].to_numpy(dtype=np.float64),
+                         minlength=len(keys) * n_periods).reshape(len(keys), n_periods)
+    start = np.full(len(keys), n_periods)
+    np.minimum.at(start, codes, columns)
+    matrix[np.arange(n_periods) < start[:, None]] = np.nan
+    periods = pd.DatetimeIndex(period_starts(first + np.arange(n_periods), frequency), name='period')
+    return keys, periods, matrix
+
+def origin_forecasts(matrix, model, origins, horizon, season_length=52, span=4):
+    """Forecasts of every series from every origin, shape (series, origins, horizon).
+
+    An origin o forecasts columns o .. o + horizon - 1 from columns before o.
+    Predictions are floored at zero; NaN where a series has no history yet.
+    """
+    origins = np.asarray(origins, dtype=np.intp)
+    steps = np.arange(horizon)
+    if model == 'linear':
+        # Expanding least-squares fit from running sums, read off at each origin
+        valid = ~np.isnan(matrix)
+        x = np.arange(matrix.shape[1], dtype=np.float64)
+        y = np.where(valid, matrix, 0.0)
+        n, sx, sy = (np.cumsum(a, axis=1)[:, origins - 1] for a in (valid, valid * x, y))
+        sxx, sxy = (np.cumsum(a, axis=1)[:, origins - 1] for a in (valid * x * x, y * x))
+        with np.errstate(invalid='ignore', divide='ignore'):
+            denominator = n * sxx - sx * sx
+            slope = np.where(denominator > 0, (n * sxy - sx * sy) / denominator, 0.0)
+            intercept = (sy - slope * sx) / n
+        future = (origins[:, None] + steps[None, :]).astype(np.float64)
+        predicted = intercept[:, :, None] + slope[:, :, None] * future[None, :, :]
+    elif model == 'exponential':
+        # The smoothed level after the last seen period is the flat forecast
+        level = pd.DataFrame(matrix.T).ewm(span=span, adjust=False, ignore_na=True).mean().to_numpy().T
+        predicted = np.repeat(level[:, origins - 1, None], horizon, axis=2)
+    elif model == 'seasonal_naive':
+        lagged = origins[:, None] - season_length + steps[None, :] % season_length
+        predicted = matrix[:, np.maximum(lagged, 0)]
+        predicted[:, lagged < 0] = np.nan
+    else:
+        raise ValueError(f"Unknown forecast model: {model}")
+    return np.maximum(predicted, 0)
+
+def backtest_errors(matrix, model, horizon, n_origins, season_length=52, span=4):
+    """(MAE, MAPE %, points) per series over a rolling-origin backtest.
+
+    The last n_origins origins that leave horizon periods to score are used.
+    MAPE skips periods whose actual value is zero.
+    """
+    n_periods = matrix.shape[1]
+    origins = np.arange(max(n_periods - horizon - n_origins + 1, 1), n_periods - horizon + 1)
+    if len(origins) == 0:
+        empty = np.full(len(matrix), np.nan)
+        return empty, empty, np.zeros(len(matrix), dtype=np.int64)
+
+    predicted = origin_forecasts(matrix, model, origins, horizon, season_length, span)
+    actual = matrix[:, origins[:, None] + np.arange(horizon)[None, :]]
+    error = np.abs(predicted - actual)
+    scored = ~np.isnan(error)
+    points = scored.sum(axis=(1, 2))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mae = np.where(scored, error, 0.0).sum(axis=(1, 2)) / points
+        relative = scored & (actual != 0)
+        mape = 100 * np.where(relative, error / np.abs(actual), 0.0).sum(axis=(1, 2)) / relative.sum(axis=(1, 2))
+    return mae, mape, points
+
+def _forecast_chunk(matrix, models, horizon, n_origins, season_length, span):
+    """Forecasts and backtest errors of one block of series for every model."""
+    n_periods = matrix.shape[1]
+    return {
+        model: (origin_forecasts(matrix, model, [n_periods], horizon, season_length, span)[:, 0, :],
+                backtest_errors(matrix, model, horizon, n_origins, season_length, span))
+        for model in models
+    }
+
+def forecast_series(df, by, value='price', models=None, frequency=None, horizon=None,
+                    n_origins=None, workers=None):
+    """Forecast per-period totals of value for every group of df[by], with backtests.
+
+    Arguments left as None default to FORECAST_CONFIG. With many series they
+    are split into blocks spread over a process pool.
+
+    Returns (forecasts, accuracy): a long frame with the group columns,
+    'model', 'period' and 'predicted', and one with the group columns,
+    'model', 'mae', 'mape' and 'points' from the rolling-origin backtest.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+    models = list(models or FORECAST_CONFIG['models'])
+    frequency = frequency or FORECAST_CONFIG['frequency']
+    horizon = horizon or FORECAST_CONFIG['horizon']
+    n_origins = n_origins or FORECAST_CONFIG['backtest_origins']
+    season_length = FORECAST_CONFIG['season_lengths'][frequency]
+    span = TIMESERIES_CONFIG['ewma_spans'][frequency]
+
+    keys, periods, matrix = period_matrix(df, by, value, frequency)
+    if not len(keys):
+        return (pd.DataFrame(columns=by + ['model', 'period', 'predicted']),
+                pd.DataFrame(columns=by + ['model', 'mae', 'mape', 'points']))
+
+    workers = workers or FORECAST_CONFIG['workers'] or os.cpu_count() or 1
+    if len(keys) < FORECAST_CONFIG['parallel_min_series']:
+        workers = 1
+    blocks = np.array_split(matrix, min(workers, len(keys)))
+    arguments = (models, horizon, n_origins, season_length, span)
+    if len(blocks) == 1:
+        results = [_forecast_chunk(matrix, *arguments)]
+    else:
+        with spawn_pool(len(blocks)) as pool:
+            results = list(pool.map(_forecast_chunk, blocks, *[[argument] * len(blocks) for argument in arguments]))
+
+    future = period_starts(period_ordinals(periods[-1:].to_numpy(), frequency)[0] + 1 + np.arange(horizon), frequency)
+    group_frame = keys.to_frame(index=False)
+    forecasts, accuracy = [], []
+    for model in models:
+        predicted = np.concatenate([result[model][0] for result in results])
+        mae, mape, points = (np.concatenate(parts) for parts in zip(*(result[model][1] for result in results)))
+        forecast = group_frame.loc[group_frame.index.repeat(horizon)].reset_index(drop=True)
+        forecast['model'] = model
+        forecast['period'] = np.tile(future, len(keys))
+        forecast['predicted'] = predicted.ravel()
+        forecasts.append(forecast)
+        accuracy.append(group_frame.assign(model=model, mae=mae, mape=mape, points=points))
+    return pd.concat(forecasts, ignore_index=True), pd.concat(accuracy, ignore_index=True)
@@ -0,0 +1,105 @@
+"""
+Bounded memoization for analytics and chart functions keyed by filter state.
+
+st.cache_data would hash the whole filtered DataFrame on every call. Frames
+produced by load_petrol_data and filter_data already identify themselves as
+(dataset id, filter criteria) through datasets.view_key, so that pair is the
+cache key here. Any other frame bypasses the cache.
+
+Cached results are shared between sessions; callers must not mutate them.
+"""
+
+import threading
+from collections import OrderedDict
+from functools import wraps
+from config import CACHE_CONFIG
+from datasets import view_key
+
+class BoundedCache:
+    """Size-bounded mapping with LRU or FIFO eviction and hit/miss counters."""
+
+    def __init__(self, max_entries=128, policy='lru'):
+        if policy not in ('lru', 'fifo'):
+            raise ValueError(f"Unknown eviction policy: {policy}")
+        self.max_entries = max_entries
+        self.policy = policy
+        self.hits = 0
+        self.misses = 0
+        self.bypasses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                if self.policy == 'lru':
+                    self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'policy': self.policy,
+            'hits': self.hits,
+            'misses': self.misses,
+            'bypasses': self.bypasses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+_caches = {}
+_MISSING = object()
+
+def get_cache(name):
+    """Return the named cache, creating it from CACHE_CONFIG on first use."""
+    if name not in _caches:
+        settings = CACHE_CONFIG.get(name, CACHE_CONFIG['default'])
+        _caches[name] = BoundedCache(settings['max_entries'], settings['policy'])
+    return _caches[name]
+
+def cache_stats():
+    """Counters for every cache created so far."""
+    return {name: cache.stats() for name, cache in _caches.items()}
+
+def clear_caches():
+    """Empty every cache, e.g. before timing a cold run."""
+    for cache in _caches.values():
+        cache.clear()
+
+def memoize(cache_name):
+    """Cache func(df, *args, **kwargs) by the view key of df and the other arguments."""
+    def decorator(func):
+        @wraps(func)
+        def wrapper(df, *args, **kwargs):
+            cache = get_cache(cache_name)
+            key = view_key(df)
+            if key is None:
+                cache.bypasses += 1
+                return func(df, *args, **kwargs)
+
+            key = (func.__name__, key, args, tuple(sorted(kwargs.items())))
+            result = cache.get(key, _MISSING)
+            if result is _MISSING:
+                result = func(df, *args, **kwargs)
+                cache.put(key, result)
+            return result
+        return wrapper
+    return decorator
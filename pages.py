@@ -1,6 +1,15 @@
 import streamlit as st
-from data_loader import calculate_kpis, generate_predictions, get_insights
-from charts import *
+from analytics import calculate_kpis, generate_predictions, get_insights, group_forecasts, model_accuracy
+from anomalies import flagged_transactions, score_transactions
+from config import ANOMALY_CONFIG, FORECAST_CONFIG, STARTUP_CONFIG, TABLE_CONFIG, TIMESERIES_CONFIG, VALIDATION_CONFIG
+from exports import EXPORT_FORMATS, deferred_export
+from fleet import vehicle_summary
+from memo import cache_stats
+from table_view import page_rows, table_rows
+from timeseries import FREQUENCIES
+from timing import span
+from validation import rejection_report
+from warmup import warmup_status
 
 def render_kpi_cards(kpis):
     """Render KPI cards with professional styling."""
@@ -38,58 +47,92 @@ def render_kpi_cards(kpis):
         </div>
         """, unsafe_allow_html=True)
 
+def render_chart(builder, *args):
+    """Build a chart and draw it in a chart container, timing both steps."""
+    name = builder.__name__.replace('create_', '').replace('_chart', '')
+    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
+    with span(f"build {name}"):
+        fig = builder(*args)
+    with span(f"draw {name}"):
+        st.plotly_chart(fig, use_container_width=True)
+    st.markdown('</div>', unsafe_allow_html=True)
+
 def dashboard_page(df_filtered):
     """Main dashboard page with executive summary."""
+    # Plotly is only imported once a page that draws charts is rendered
+    from charts import (create_spending_trend_chart, create_station_comparison_chart,
+                        create_price_analysis_chart, create_consumption_chart, create_monthly_summary_chart)
+    
     st.markdown("## 📊 Executive Dashboard")
     
     # Calculate and display KPIs
-    kpis = calculate_kpis(df_filtered)
+    with span("kpis"):
+        kpis = calculate_kpis(df_filtered)
     render_kpi_cards(kpis)
     
     st.markdown("<br>", unsafe_allow_html=True)
     
+    # Trend charts are drawn from resampled series, not individual transactions
+    frequency = st.radio(
+        "Trend granularity",
+        FREQUENCIES,
+        index=FREQUENCIES.index(TIMESERIES_CONFIG['chart_frequency']),
+        format_func=str.title,
+        horizontal=True,
+        key="trend_frequency"
+    )
+    
     # Main charts
     col1, col2 = st.columns(2)
     
     with col1:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_trend = create_spending_trend_chart(df_filtered)
-        st.plotly_chart(fig_trend, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_chart(create_spending_trend_chart, df_filtered, frequency)
     
     with col2:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_station = create_station_comparison_chart(df_filtered)
-        st.plotly_chart(fig_station, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_chart(create_station_comparison_chart, df_filtered)
     
     # Secondary charts
     col3, col4 = st.columns(2)
     
     with col3:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_price = create_price_analysis_chart(df_filtered)
-        st.plotly_chart(fig_price, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_chart(create_price_analysis_chart, df_filtered, frequency)
     
     with col4:
-        st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-        fig_consumption = create_consumption_chart(df_filtered)
-        st.plotly_chart(fig_consumption, use_container_width=True)
-        st.markdown('</div>', unsafe_allow_html=True)
+        render_chart(create_consumption_chart, df_filtered)
     
     # Monthly overview
-    st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-    fig_monthly = create_monthly_summary_chart(df_filtered)
-    st.plotly_chart(fig_monthly, use_container_width=True)
-    st.markdown('</div>', unsafe_allow_html=True)
+    render_chart(create_monthly_summary_chart, df_filtered)
+    
+    # Fleet overview, served from the rollup cube's vehicle dimension
+    if 'vehicle' in df_filtered.columns and df_filtered['vehicle'].nunique() > 1:
+        st.markdown("### 🚗 Fleet Overview")
+        with span("fleet summary"):
+            fleet = vehicle_summary(df_filtered).round(2)
+        st.dataframe(
+            fleet,
+            use_container_width=True,
+            column_config={
+                'visits': 'Visits',
+                'total_spent': st.column_config.NumberColumn('Total Spent', format='R%.2f'),
+                'spend_share_pct': st.column_config.NumberColumn('Share of Spend', format='%.1f%%'),
+                'total_litres': st.column_config.NumberColumn('Litres', format='%.1f'),
+                'avg_price_per_litre': st.column_config.NumberColumn('Avg Price/L', format='R%.2f')
+            }
+        )
 
-def analytics_page(df_filtered):
-    """Advanced analytics and predictions page."""
+def analytics_page(df_filtered, df_all=None):
+    """Advanced analytics and predictions page.
+    
+    df_all is the unfiltered frame; anomalies are scored against its full
+    history and then narrowed to the filtered rows.
+    """
+    from charts import MODEL_LABELS, create_group_forecast_chart, create_prediction_chart
+    
     st.markdown("## 🔍 Business Intelligence & Forecasting")
     
     # Key insights
-    insights = get_insights(df_filtered)
+    with span("insights"):
+        insights = get_insights(df_filtered)
     
     if insights:
         st.markdown("### 💡 Strategic Insights")
@@ -100,19 +143,35 @@ def analytics_page(df_filtered):
             </div>
             """, unsafe_allow_html=True)
     
+    # Suspicious transactions
+    with span("anomalies"):
+        scores = score_transactions(df_all if df_all is not None else df_filtered)
+        flagged = flagged_transactions(df_filtered, scores)
+    
+    st.markdown("### 🚨 Flagged Transactions")
+    if flagged.empty:
+        st.success("✅ No suspicious transactions in the current selection.")
+    else:
+        reasons = flagged['reasons'].str.split('; ').explode().value_counts()
+        st.caption(f"{len(flagged):,} of {len(df_filtered):,} transactions flagged: " +
+                   ", ".join(f"{reason} ({count:,})" for reason, count in reasons.items()))
+        st.dataframe(
+            flagged.head(ANOMALY_CONFIG['display_rows']),
+            use_container_width=True,
+            hide_index=True,
+            column_config={'score': st.column_config.NumberColumn('Robust z', format='%.1f')}
+        )
+    
     # Predictions section
     st.markdown("### 🔮 Predictive Analytics")
     
     col1, col2 = st.columns([2, 1])
     
     with col1:
-        predictions = generate_predictions(df_filtered)
-        predictions = generate_predictions(df_filtered)
+        with span("predictions"):
+            predictions = generate_predictions(df_filtered)
         if not predictions.empty:
-            st.markdown('<div class="chart-container">', unsafe_allow_html=True)
-            fig_pred = create_prediction_chart(predictions)
-            st.plotly_chart(fig_pred, use_container_width=True)
-            st.markdown('</div>', unsafe_allow_html=True)
+            render_chart(create_prediction_chart, predictions)
         else:
             st.info("Insufficient data for reliable predictions. Need at least 3 data points.")
     
@@ -129,8 +188,48 @@ def analytics_page(df_filtered):
             </div>
             """, unsafe_allow_html=True)
     
+    # Per-station / per-vehicle forecasts, scored by a rolling-origin backtest
+    group_columns = {'Station': 'station', 'Vehicle': 'vehicle'}
+    group_columns = {label: column for label, column in group_columns.items() if column in df_filtered.columns}
+    if group_columns:
+        st.markdown("### 🏪 Forecasts by Group")
+        group_label = st.radio("Forecast by", list(group_columns), horizontal=True, key="forecast_group")
+        by = group_columns[group_label]
+        with span("group_forecasts"):
+            forecasts, accuracy = group_forecasts(df_filtered, by)
+            summary = model_accuracy(accuracy)
+        
+        if summary.empty or summary['mae'].isna().all():
+            st.info("Not enough history to backtest forecasts for this selection.")
+        else:
+            best_model = summary['mae'].idxmin()
+            model = st.selectbox(
+                "Model",
+                list(summary.index),
+                index=list(summary.index).index(best_model),
+                format_func=lambda name: MODEL_LABELS.get(name, name) + (" (best MAE)" if name == best_model else ""),
+                key="forecast_model"
+            )
+            
+            col5, col6 = st.columns([2, 1])
+            with col5:
+                render_chart(create_group_forecast_chart, forecasts, by, model)
+            with col6:
+                st.markdown(f"**Backtest accuracy** ({FORECAST_CONFIG['backtest_origins']} origins, "
+                            f"{FORECAST_CONFIG['horizon']} {FORECAST_CONFIG['frequency']} periods ahead)")
+                st.dataframe(
+                    summary.rename(index=MODEL_LABELS),
+                    use_container_width=True,
+                    column_config={
+                        'mae': st.column_config.NumberColumn('MAE', format='R%.0f'),
+                        'mape': st.column_config.NumberColumn('MAPE', format='%.1f%%'),
+                        'series': st.column_config.NumberColumn('Series')
+                    }
+                )
+    
     # Performance metrics
-    kpis = calculate_kpis(df_filtered)
+    with span("kpis"):
+        kpis = calculate_kpis(df_filtered)
     if kpis.get('monthly_spend', 0) > 0:
         st.markdown("### 📊 Performance Metrics")
         
@@ -154,8 +253,12 @@ def analytics_page(df_filtered):
             </div>
             """, unsafe_allow_html=True)
 
-def data_page(df_filtered):
-    """Data export and detailed view page."""
+def data_page(df_filtered, rejections=None):
+    """Data export and detailed view page.
+    
+    rejections is the (quarantine, rows read) pair of analytics.load_rejections
+    for the loaded dataset.
+    """
     st.markdown("## 📋 Data Management")
     
     if df_filtered.empty:
@@ -185,28 +288,118 @@ def data_page(df_filtered):
     # Data table
     st.markdown("### 📄 Detailed Records")
     
-    # Show raw data without formatting for better display
-    st.dataframe(df_filtered, use_container_width=True, height=500)
+    # Sorting, searching and paging happen here; only the visible page is sent to the browser
+    columns = list(df_filtered.columns)
+    sortable = [c for c in TABLE_CONFIG['sortable_columns'] if c in columns] or columns
+    default_sort = TABLE_CONFIG['default_sort']
     
-    # Export options
-    st.markdown("### 📥 Export Options")
+    col1, col2, col3, col4 = st.columns([2, 1, 2, 3])
+    with col1:
+        sort_column = st.selectbox("Sort by", sortable, index=sortable.index(default_sort) if default_sort in sortable else 0, key="table_sort")
+    with col2:
+        descending = st.checkbox("Descending", value=True, key="table_descending")
+    with col3:
+        search_column = st.selectbox("Search in", columns, index=columns.index('station') if 'station' in columns else 0, key="table_search_column")
+    with col4:
+        query = st.text_input("Search", value="", placeholder="Contains...", key="table_query").strip()
     
-    col1, col2 = st.columns(2)
+    with span("table order"):
+        order = table_rows(df_filtered, sort_column, descending, search_column, query)
     
+    col1, col2 = st.columns([1, 3])
     with col1:
-        csv = df_filtered.to_csv(index=False)
-        st.download_button(
-            label="📊 Download CSV",
-            data=csv,
-            file_name=f"petrol_data_{df_filtered['date'].min().strftime('%Y%m%d') if 'date' in df_filtered.columns else 'export'}.csv",
-            mime="text/csv"
-        )
-    
+        page_size = st.selectbox("Rows per page", TABLE_CONFIG['page_sizes'], key="table_page_size")
+    pages_total = max(1, -(-len(order) // page_size))
     with col2:
-        json_data = df_filtered.to_json(orient='records', date_format='iso')
+        page = min(st.number_input("Page", min_value=1, max_value=pages_total, value=1, step=1, key="table_page"), pages_total)
+    
+    rows = page_rows(order, page, page_size)
+    st.dataframe(df_filtered.iloc[rows], use_container_width=True, hide_index=True)
+    if len(order):
+        first = (page - 1) * page_size + 1
+        st.caption(f"Showing {first:,}–{first + len(rows) - 1:,} of {len(order):,} records (page {page} of {pages_total})")
+    else:
+        st.caption("No records match the search.")
+    
+    # Export options
+    st.markdown("### 📥 Export Options")
+    
+    # Files are only generated, in chunks, when a button is clicked
+    file_stem = f"petrol_data_{df_filtered['date'].min().strftime('%Y%m%d') if 'date' in df_filtered.columns else 'export'}"
+    
+    for column, (fmt, spec) in zip(st.columns(len(EXPORT_FORMATS)), EXPORT_FORMATS.items()):
+        with column:
+            st.download_button(
+                label=spec['label'],
+                data=deferred_export(df_filtered, fmt),
+                file_name=f"{file_stem}.{spec['extension']}",
+                mime=spec['mime'],
+                key=f"export_{fmt}"
+            )
+    
+    # Rows rejected at ingest
+    st.markdown("### 🧹 Data Quality")
+    quarantine, rows_read = rejections if rejections is not None else (None, 0)
+    if quarantine is None or quarantine.empty:
+        st.success("✅ Every loaded row passed validation.")
+    else:
+        report = rejection_report(quarantine, rows_read)
+        st.caption(f"{len(quarantine):,} rows were quarantined at load and are excluded from every page. "
+                   "'row' counts data rows from the top of the source, starting at 0 under the header.")
+        st.dataframe(
+            report,
+            use_container_width=True,
+            hide_index=True,
+            column_config={
+                'rule': st.column_config.TextColumn('Rule'),
+                'rows': st.column_config.NumberColumn('Rows'),
+                'pct': st.column_config.NumberColumn('Share', format='%.2f%%')
+            }
+        )
+        rules = [column for column in report.index if column in quarantine.columns]
+        st.dataframe(quarantine.drop(columns=rules).head(VALIDATION_CONFIG['display_rows']),
+                     use_container_width=True, hide_index=True)
         st.download_button(
-            label="📋 Download JSON",
-            data=json_data,
-            file_name=f"petrol_data_{df_filtered['date'].min().strftime('%Y%m%d') if 'date' in df_filtered.columns else 'export'}.json",
-            mime="application/json"
-        )
\ No newline at end of file
+            label="📄 Download Quarantine (CSV)",
+            data=deferred_export(quarantine, 'csv'),
+            file_name="quarantine.csv",
+            mime="text/csv",
+            key="export_quarantine"
+        )
+
+def performance_panel(records):
+    """Sidebar breakdown of the rerun's timing spans, the analytics cache counters and, on request, import costs."""
+    with st.sidebar.expander("⏱️ Performance", expanded=False):
+        total, stages = records[0], records[1:]
+        st.metric("Rerun", f"{total['ms']:.0f} ms")
+        st.dataframe(
+            [{'Stage': '\u2003' * record['depth'] + record['name'], 'ms': round(record['ms'], 1)} for record in stages],
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        caches = [
+            {'Cache': name, 'Entries': stats['entries'], 'Hits': stats['hits'], 'Misses': stats['misses'],
+             'Hit Rate': f"{stats['hit_rate']:.0%}"}
+            for name, stats in cache_stats().items()
+        ]
+        if caches:
+            st.dataframe(caches, use_container_width=True, hide_index=True)
+        
+        # Import costs need a fresh interpreter, so they are profiled only on request, once per process
+        if st.checkbox("Profile cold-start imports", key="perf_imports"):
+            from startup import cold_start_profile
+            with st.spinner("Importing the app in a fresh interpreter..."):
+                wall, slowest = cold_start_profile()
+            st.caption(f"Cold start: {wall:.2f} s (budget {STARTUP_CONFIG['budget_seconds']:.1f} s)")
+            st.dataframe(
+                [{'Module': record['module'], 'Cumulative ms': round(record['cumulative_us'] / 1000, 1),
+                  'Self ms': round(record['self_us'] / 1000, 1)} for record in slowest],
+                use_container_width=True,
+                hide_index=True
+            )
+        
+        warmup = warmup_status()
+        if warmup:
+            st.caption(f"Cache warm-up: {warmup['done']} of {warmup['queued']} tasks in {warmup['seconds']:.1f} s" +
+                       (f", {len(warmup['errors'])} failed" if warmup['errors'] else ""))
@@ -0,0 +1,16 @@
+"""
+Process pools for the CPU-bound work spread over cores: fleet loading,
+batch forecasting and batch reports.
+"""
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+def spawn_pool(workers):
+    """ProcessPoolExecutor with workers processes started by 'spawn'.
+
+    Spawned workers do not inherit the threads of a running Streamlit server,
+    which a forked child could deadlock on, and they behave the same on every
+    platform. Worker functions must be importable module-level functions.
+    """
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
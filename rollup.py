@@ -0,0 +1,93 @@
+"""
+Pre-aggregated year x month x station (x vehicle) rollup cube.
+
+Every sidebar filter selects whole cells of this cube, so totals, means,
+standard deviations, extremes and per-station or per-month breakdowns of a
+filtered frame can be combined from a few hundred cells instead of
+re-scanning the raw transactions on every rerun.
+"""
+
+import numpy as np
+import pandas as pd
+
+DIMENSIONS = ('year', 'month_num', 'month_name', 'station', 'vehicle')
+MEASURES = ('price', 'litres', 'liter_price')
+
+class RollupCube:
+    """Sums, counts, sums of squares and extremes per (year, month, station) cell.
+
+    Squares are taken around a per-measure shift (the overall mean) so the
+    variance recovered from them does not suffer from cancellation.
+    """
+
+    def __init__(self, df):
+        # Callers only build a cube when at least one dimension is present
+        self.dimensions = [column for column in DIMENSIONS if column in df.columns]
+        self.measures = [column for column in MEASURES if column in df.columns]
+        self.shift = {}
+
+        work = pd.DataFrame({column: df[column] for column in self.dimensions})
+        work['rows'] = 1
+        aggregations = {'rows': ('rows', 'sum')}
+        for column in self.measures:
+            values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            self.shift[column] = float(np.nanmean(values)) if np.isfinite(values).any() else 0.0
+            work[column] = values
+            work[column + '_sq'] = (values - self.shift[column]) ** 2
+            aggregations.update({
+                column + '_sum': (column, 'sum'),
+                column + '_count': (column, 'count'),
+                column + '_sumsq': (column + '_sq', 'sum'),
+                column + '_min': (column, 'min'),
+                column + '_max': (column, 'max')
+            })
+        if 'date' in df.columns:
+            work['date'] = df['date']
+            aggregations.update({'date_min': ('date', 'min'), 'date_max': ('date', 'max')})
+
+        self.cells = work.groupby(self.dimensions, observed=True, dropna=False).agg(**aggregations).reset_index()
+
+    def select(self, **criteria):
+        """Cells matching every dimension=value pair."""
+        cells = self.cells
+        for column, value in criteria.items():
+            cells = cells[cells[column] == value]
+        return cells
+
+    def totals(self, cells):
+        """Combine cells into overall statistics."""
+        result = {'rows': int(cells['rows'].sum())}
+        for column in self.measures:
+            result[column] = self._combine(cells, column)
+        if 'date_min' in cells.columns:
+            result['date_min'] = cells['date_min'].min()
+            result['date_max'] = cells['date_max'].max()
+        if 'station' in self.dimensions and 'price' in self.measures:
+            result['by_station'] = self.breakdown(cells, 'station', 'price').rename('price')
+        return result
+
+    def breakdown(self, cells, by, measure):
+        """Sum of measure grouped by one or more dimensions."""
+        return cells.groupby(by, observed=True)[measure + '_sum'].sum()
+
+    def group_totals(self, cells, by):
+        """Row count and per-measure sum, count and mean for each group of dimensions."""
+        columns = ['rows'] + [f"{column}_{stat}" for column in self.measures for stat in ('sum', 'count')]
+        table = cells.groupby(by, observed=True)[columns].sum()
+        for column in self.measures:
+            counts = table[column + '_count']
+            table[column + '_mean'] = (table[column + '_sum'] / counts).where(counts > 0)
+        return table
+
+    def _combine(self, cells, column):
+        count = cells[column + '_count'].sum()
+        total = cells[column + '_sum'].sum()
+        stats = {'sum': total, 'count': int(count), 'mean': np.nan, 'std': np.nan,
+                 'min': cells[column + '_min'].min(), 'max': cells[column + '_max'].max()}
+        if count > 0:
+            stats['mean'] = total / count
+        if count > 1:
+            shifted = total - count * self.shift[column]
+            variance = (cells[column + '_sumsq'].sum() - shifted ** 2 / count) / (count - 1)
+            stats['std'] = float(np.sqrt(max(variance, 0.0)))
+        return stats
@@ -0,0 +1,95 @@
+"""
+Cold-start profiler for the Petrol Analytics Dashboard
+Usage: python startup.py [--top N] [--check] [--budget SECONDS]
+
+Imports the app in a fresh interpreter with -X importtime, then reports the
+slowest imports by cumulative and self time. With --check it exits non-zero
+when cold start exceeds the configured budget or a deferred module is
+imported eagerly; tests/test_startup.py runs the same check under pytest.
+The dashboard's performance panel shows cold_start_profile on request.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+from functools import lru_cache
+from config import STARTUP_CONFIG
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+def profile_imports(module=STARTUP_CONFIG['entry_module']):
+    """Import module in a fresh interpreter; return (wall seconds, import records).
+
+    Each record is a dict with 'module', 'self_us', 'cumulative_us' and 'depth'.
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, cwd=APP_DIR
+    )
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{result.stderr.strip()}")
+
+    records = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        records.append({
+            'module': name.strip(),
+            'self_us': int(self_us),
+            'cumulative_us': int(cumulative_us),
+            'depth': (len(name) - len(name.lstrip())) // 2
+        })
+    return wall, records
+
+def eager_modules(records, modules=STARTUP_CONFIG['deferred_modules']):
+    """Deferred top-level packages that were imported anyway."""
+    imported = {record['module'].split('.')[0] for record in records}
+    return sorted(set(modules) & imported)
+
+@lru_cache(maxsize=1)
+def cold_start_profile(top=10):
+    """(wall seconds, slowest imports by cumulative time) of one profiled cold start, measured once per process."""
+    wall, records = profile_imports()
+    return wall, sorted(records, key=lambda r: r['cumulative_us'], reverse=True)[:top]
+
+def print_report(wall, records, top=15):
+    """Print the slowest imports by cumulative and by self time."""
+    entry = next((r for r in records if r['module'] == STARTUP_CONFIG['entry_module']), None)
+    print(f"Cold start: {wall:.3f}s wall, "
+          f"{(entry['cumulative_us'] if entry else 0) / 1e6:.3f}s importing {STARTUP_CONFIG['entry_module']}")
+
+    for title, key in (('cumulative', 'cumulative_us'), ('self', 'self_us')):
+        print(f"\nTop {top} imports by {title} time:")
+        for record in sorted(records, key=lambda r: r[key], reverse=True)[:top]:
+            print(f"  {record[key] / 1000:9.1f} ms  {record['module']}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--check', action='store_true', help='fail if the cold-start budget is exceeded')
+    parser.add_argument('--budget', type=float, default=STARTUP_CONFIG['budget_seconds'])
+    args = parser.parse_args()
+
+    wall, records = profile_imports()
+    print_report(wall, records, args.top)
+
+    if args.check:
+        failures = []
+        if wall > args.budget:
+            failures.append(f"cold start {wall:.3f}s exceeds budget {args.budget:.3f}s")
+        eager = eager_modules(records)
+        if eager:
+            failures.append(f"deferred modules imported at startup: {', '.join(eager)}")
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        if failures:
+            sys.exit(1)
+        print("\nOK: cold start within budget")
+
+if __name__ == "__main__":
+    main()
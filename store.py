@@ -0,0 +1,241 @@
+"""
+Optional SQLite backing store for the prepared transactions.
+
+With DATA_CONFIG['store_path'] set, the prepared transactions are written
+to a local SQLite file once per source version, and the dashboard no longer
+holds the full history in every session. filter_data reads only the
+matching rows through indexes on date, (year, month_num), station and
+vehicle. summarise, breakdown and group_summary run their aggregations as
+SQL over the same filters, so only result-sized data reaches pandas.
+
+Frames read from the store carry its path, its source version, the filter
+criteria and their row count in attrs, like the dataset views of
+datasets.stamp_view, so aggregates and memoized analytics over them are
+routed back to SQL.
+"""
+
+import calendar
+import datetime
+import sqlite3
+from contextlib import closing
+import numpy as np
+import pandas as pd
+from rollup import DIMENSIONS, MEASURES
+from validation import RULES
+
+TABLE = 'transactions'
+QUARANTINE_TABLE = 'quarantine'
+INDEXES = {
+    'date': ('date',),
+    'year_month': ('year', 'month_num'),
+    'station': ('station',),
+    'vehicle': ('vehicle',)
+}
+MONTH_NUMBERS = {name: number for number, name in enumerate(calendar.month_name) if name}
+
+def plain_value(value):
+    """value as a plain Python scalar if it is a NumPy one (SQLite, JSON and attrs want those)."""
+    return value.item() if hasattr(value, 'item') else value
+
+class TransactionStore:
+    """Transactions table in the SQLite file at path, with filtered reads and SQL aggregates."""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self._columns = None
+
+    def _connect(self):
+        return closing(sqlite3.connect(self.path))
+
+    def _meta(self, connection, key):
+        try:
+            row = connection.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return row[0] if row else None
+
+    @property
+    def version(self):
+        """Source version the table was written from, or None before the first write."""
+        with self._connect() as connection:
+            return self._meta(connection, 'version')
+
+    @property
+    def row_count(self):
+        """Rows in the table, as recorded when it was written."""
+        with self._connect() as connection:
+            return int(self._meta(connection, 'rows') or 0)
+
+    @property
+    def columns(self):
+        if self._columns is None:
+            with self._connect() as connection:
+                self._columns = [row[1] for row in connection.execute(f"PRAGMA table_info({TABLE})")]
+        return self._columns
+
+    @property
+    def empty(self):
+        if not self.columns:
+            return True
+        with self._connect() as connection:
+            return connection.execute(f"SELECT 1 FROM {TABLE} LIMIT 1").fetchone() is None
+
+    def write(self, df, version, quarantine=None):
+        """Replace the table with df and index its filter columns.
+
+        quarantine, the rows validation rejected, is kept in its own table.
+        """
+        # Means are kept to shift sums of squares, as RollupCube does
+        shifts = {
+            column: float(np.nanmean(df[column].to_numpy(dtype=np.float64, na_value=np.nan)))
+            for column in MEASURES if column in df.columns and df[column].notna().any()
+        }
+        with self._connect() as connection, connection:
+            connection.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            df.to_sql(TABLE, connection, index=False, chunksize=50000)
+            connection.execute(f"DROP TABLE IF EXISTS {QUARANTINE_TABLE}")
+            if quarantine is not None and len(quarantine):
+                quarantine.to_sql(QUARANTINE_TABLE, connection, index=False)
+            for name, columns in INDEXES.items():
+                if all(column in df.columns for column in columns):
+                    connection.execute(f"CREATE INDEX idx_{name} ON {TABLE} ({', '.join(columns)})")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            connection.execute("DELETE FROM meta")
+            connection.executemany(
+                "INSERT INTO meta VALUES (?, ?)",
+                [('version', repr(version)), ('rows', str(len(df)))] + [(f'shift_{column}', repr(shift)) for column, shift in shifts.items()]
+            )
+        self._columns = None
+        return self
+
+    def _where(self, criteria):
+        """WHERE clause and parameters for filter_data criteria (month names match by number)."""
+        clauses, params = [], []
+        for column, value in criteria.items():
+            # Dates are stored as ISO text, which compares in date order
+            if column == 'date_from':
+                clauses.append("date >= ?")
+                params.append(value)
+                continue
+            if column == 'date_to':
+                clauses.append("date < ?")
+                params.append((datetime.date.fromisoformat(value) + datetime.timedelta(days=1)).isoformat())
+                continue
+            if column == 'month_name':
+                column, value = 'month_num', MONTH_NUMBERS.get(value, -1)
+            clauses.append(f"{column} = ?")
+            params.append(plain_value(value))
+        return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+    def rows(self, criteria):
+        """Rows matching criteria in insertion order, stamped as a view of this store."""
+        where, params = self._where(criteria)
+        with self._connect() as connection:
+            df = pd.read_sql_query(f"SELECT * FROM {TABLE}{where} ORDER BY rowid", connection, params=params,
+                                   parse_dates=['date'] if 'date' in self.columns else None)
+        df.attrs['store'] = self.path
+        df.attrs['store_version'] = self.version
+        df.attrs['filters'] = {column: plain_value(value) for column, value in criteria.items()}
+        df.attrs['rows'] = len(df)
+        return df
+
+    def quarantine(self):
+        """Rows rejected by validation when the store was written (empty if none)."""
+        with self._connect() as connection:
+            try:
+                quarantine = pd.read_sql_query(f"SELECT * FROM {QUARANTINE_TABLE}", connection)
+            except (sqlite3.OperationalError, pd.errors.DatabaseError):
+                return pd.DataFrame()
+        if 'date' in quarantine.columns:
+            quarantine['date'] = pd.to_datetime(quarantine['date'])
+        rules = [column for column in quarantine.columns if column in RULES]
+        quarantine[rules] = quarantine[rules].astype(bool)
+        return quarantine
+
+    def date_extent(self):
+        """(first, last) transaction date, read from the date index."""
+        if 'date' not in self.columns:
+            return pd.NaT, pd.NaT
+        with self._connect() as connection:
+            first, last = connection.execute(f"SELECT MIN(date), MAX(date) FROM {TABLE}").fetchone()
+        return pd.Timestamp(first), pd.Timestamp(last)
+
+    def distinct(self, column, criteria=None):
+        """Distinct values of column matching criteria; months come in calendar order."""
+        where, params = self._where(criteria or {})
+        order = 'month_num' if column == 'month_name' and 'month_num' in self.columns else column
+        with self._connect() as connection:
+            rows = connection.execute(
+                f"SELECT {column} FROM {TABLE}{where} GROUP BY {column} ORDER BY MIN({order})", params
+            ).fetchall()
+        return [row[0] for row in rows if row[0] is not None]
+
+    def summary(self, criteria):
+        """The summary dict of datasets.summarise, aggregated in SQL."""
+        measures = [column for column in MEASURES if column in self.columns]
+        where, params = self._where(criteria)
+        with self._connect() as connection:
+            shifts = {column: float(self._meta(connection, f'shift_{column}') or 0.0) for column in measures}
+            selects = ["COUNT(*)"]
+            for column in measures:
+                selects += [f"TOTAL({column})", f"COUNT({column})",
+                            f"TOTAL(({column} - {shifts[column]!r}) * ({column} - {shifts[column]!r}))",
+                            f"MIN({column})", f"MAX({column})"]
+            if 'date' in self.columns:
+                selects += ["MIN(date)", "MAX(date)"]
+            values = connection.execute(f"SELECT {', '.join(selects)} FROM {TABLE}{where}", params).fetchone()
+
+        result = {'rows': int(values[0])}
+        for position, column in enumerate(measures):
+            total, count, sumsq, minimum, maximum = values[1 + 5 * position:6 + 5 * position]
+            stats = {'sum': total, 'count': int(count), 'mean': np.nan, 'std': np.nan,
+                     'min': np.nan if minimum is None else minimum, 'max': np.nan if maximum is None else maximum}
+            if count > 0:
+                stats['mean'] = total / count
+            if count > 1:
+                shifted = total - count * shifts[column]
+                variance = (sumsq - shifted ** 2 / count) / (count - 1)
+                stats['std'] = float(np.sqrt(max(variance, 0.0)))
+            result[column] = stats
+        if 'date' in self.columns:
+            result['date_min'], result['date_max'] = pd.Timestamp(values[-2]), pd.Timestamp(values[-1])
+        if 'station' in self.columns and 'price' in measures:
+            result['by_station'] = self.breakdown(criteria, ['station'], 'price')
+        return result
+
+    def breakdown(self, criteria, by, measure='price'):
+        """Sum of measure for each group of the by columns, as a Series."""
+        return self.group_totals(criteria, by, [measure])[measure + '_sum'].rename(measure)
+
+    def group_totals(self, criteria, by, measures=None):
+        """Row count and per-measure sum, count and mean for each group, as datasets.group_summary."""
+        measures = [column for column in (measures or MEASURES) if column in self.columns]
+        where, params = self._where(criteria)
+        selects = list(by) + ["COUNT(*) AS rows"]
+        for column in measures:
+            selects += [f"TOTAL({column}) AS {column}_sum", f"COUNT({column}) AS {column}_count"]
+        group = ', '.join(by)
+        with self._connect() as connection:
+            table = pd.read_sql_query(
+                f"SELECT {', '.join(selects)} FROM {TABLE}{where} GROUP BY {group} ORDER BY {group}",
+                connection, params=params
+            ).set_index(list(by))
+        for column in measures:
+            counts = table[column + '_count']
+            table[column + '_mean'] = (table[column + '_sum'] / counts).where(counts > 0)
+        return table
+
+    def aggregates(self, by):
+        """Whether SQL can group by every column of by."""
+        return all(column in DIMENSIONS and column in self.columns for column in by)
+
+def sync_store(path, load, version):
+    """Open the store at path, rewriting it when it holds another source version.
+
+    load() returns the (clean rows, quarantine) pair to write.
+    """
+    store = TransactionStore(path)
+    if store.version != repr(version) or store.empty:
+        df, quarantine = load()
+        store.write(df, version, quarantine)
+    return store
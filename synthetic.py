@@ -0,0 +1,86 @@
+"""
+Synthetic fuel transactions for benchmarks and demos
+Usage: python synthetic.py <rows> <output.xlsx|.csv|.parquet> [--seed N] [--vehicles N]
+
+Produces frames shaped like Spend.xlsx (Date, Station, Price, Litres,
+Liter Price) with realistic structure rather than uniform noise: a slow
+upward price drift with a yearly cycle, per-station premiums, occasional
+price steps, and fill volumes that mix full tanks with small top-ups.
+Generation is fully vectorised, so 10 million rows take seconds.
+"""
+
+import argparse
+import numpy as np
+import pandas as pd
+
+STATIONS = ['Shell Rivonia', 'Engen Sandton', 'BP Fourways', 'Sasol Midrand', 'Total Bryanston', 'Caltex Randburg']
+# Price premium per litre over the regulated base, in station order
+STATION_PREMIUMS = np.array([0.35, 0.10, 0.25, 0.0, 0.15, 0.05])
+EXCEL_MAX_ROWS = 1_048_575
+
+def generate_transactions(rows, seed=0, start='2019-01-01', years=5, stations=STATIONS, vehicles=None):
+    """Return rows synthetic transactions in date order.
+
+    Prices follow base + drift + yearly seasonality + station premium,
+    with a monthly regulated price step and a little per-fill noise.
+    With vehicles set, a 'Vehicle' column spreads rows over that many ids.
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp(start)
+    span_days = int((start + pd.DateOffset(years=years) - start).days)
+
+    days = np.sort(rng.integers(0, span_days, rows))
+    dates = start + pd.to_timedelta(days, unit='D')
+    station_codes = rng.integers(0, len(stations), rows)
+
+    # Regulated base price changes once a month; seasonality peaks mid-year
+    month_index = (dates.year - start.year) * 12 + dates.month - 1
+    month_steps = rng.normal(0.0, 0.25, month_index.max() + 1 if rows else 1).cumsum()
+    base = 19.5 + 0.9 * days / 365.0 + 0.6 * np.sin(2 * np.pi * (days / 365.25 - 0.2)) + month_steps[month_index]
+    premiums = np.resize(STATION_PREMIUMS, len(stations))[station_codes]
+    liter_price = np.round(base + premiums + rng.normal(0.0, 0.08, rows), 2)
+
+    # Roughly 70% full tanks around 45 L, the rest top-ups between 10 and 30 L
+    full_tank = rng.random(rows) < 0.7
+    litres = np.where(full_tank, rng.normal(45.0, 6.0, rows), rng.uniform(10.0, 30.0, rows))
+    litres = np.round(np.clip(litres, 5.0, 80.0), 2)
+
+    df = pd.DataFrame({
+        'Date': dates,
+        'Station': np.asarray(stations, dtype=object)[station_codes],
+        'Price': np.round(liter_price * litres, 2),
+        'Litres': litres,
+        'Liter Price': liter_price
+    })
+    if vehicles:
+        names = np.array([f"vehicle{number:03d}" for number in range(vehicles)], dtype=object)
+        df['Vehicle'] = names[rng.integers(0, vehicles, rows)]
+    return df
+
+def write_transactions(df, path):
+    """Write a synthetic frame as .xlsx, .csv or .parquet, chosen by extension."""
+    lower = str(path).lower()
+    if lower.endswith('.parquet'):
+        df.to_parquet(path, index=False)
+    elif lower.endswith('.csv'):
+        df.to_csv(path, index=False)
+    elif lower.endswith(('.xlsx', '.xlsm')):
+        if len(df) > EXCEL_MAX_ROWS:
+            raise ValueError(f"A worksheet holds at most {EXCEL_MAX_ROWS:,} rows; write .parquet or .csv instead")
+        df.to_excel(path, index=False)
+    else:
+        raise ValueError(f"Unsupported output format: {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('rows', type=int)
+    parser.add_argument('output')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--years', type=int, default=5)
+    parser.add_argument('--vehicles', type=int, default=None)
+    args = parser.parse_args()
+
+    write_transactions(generate_transactions(args.rows, args.seed, years=args.years, vehicles=args.vehicles), args.output)
+
+if __name__ == "__main__":
+    main()
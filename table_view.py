@@ -0,0 +1,59 @@
+"""
+Server-side sorting, searching and paging for the Data Management table.
+
+Only the rows of the visible page are handed to st.dataframe. Sorting a
+registered dataset or one of its views reuses the permutations precomputed
+at load time: the dataset-wide order is restricted to the view's rows with
+one lookup array instead of a fresh sort.
+"""
+
+import numpy as np
+import pandas as pd
+from datasets import view_of
+from filter_index import sort_permutation
+from memo import memoize
+
+def sorted_rows(df, column, descending=False):
+    """Positional row order of df sorted by column, missing values last."""
+    dataset, _ = view_of(df)
+    order = dataset.sort_orders.get(column) if dataset is not None else None
+    labels = df.index
+
+    if order is None:
+        order = sort_permutation(df[column])
+    elif not dataset.index.describes(df):
+        # Views keep the dataset's row positions as labels; map them to iloc positions
+        if not pd.api.types.is_integer_dtype(labels) or len(labels) and labels.max() >= dataset.n_rows:
+            order = sort_permutation(df[column])
+        else:
+            lookup = np.full(dataset.n_rows, -1, dtype=np.int64)
+            lookup[labels.to_numpy()] = np.arange(len(labels))
+            order = lookup[order]
+            order = order[order >= 0]
+
+    if descending:
+        valid = len(order) - int(df[column].isna().sum())
+        order = np.concatenate([order[:valid][::-1], order[valid:]])
+    return order
+
+def search_mask(df, column, query):
+    """Rows whose column contains query, case-insensitively."""
+    values = df[column]
+    if pd.api.types.is_datetime64_any_dtype(values):
+        text = values.dt.strftime('%Y-%m-%d')
+    else:
+        text = values.astype(str)
+    return text.str.contains(query, case=False, regex=False, na=False).to_numpy()
+
+@memoize('table')
+def table_rows(df, sort_column, descending=False, search_column=None, query=''):
+    """Positional row order for the table: sorted, then narrowed by the search."""
+    order = sorted_rows(df, sort_column, descending)
+    if query and search_column:
+        order = order[search_mask(df, search_column, query)[order]]
+    return order
+
+def page_rows(order, page, page_size):
+    """Positions shown on a 1-based page."""
+    start = (page - 1) * page_size
+    return order[start:start + page_size]
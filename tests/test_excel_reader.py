@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+from excel_reader import read_workbook
+
+def test_inferred_column_turns_to_text_when_a_later_batch_does_not_fit(tmp_path):
+    path = tmp_path / 'Spend.xlsx'
+    pd.DataFrame({
+        'Date': pd.date_range('2023-01-01', periods=6),
+        'Price': [100.0, 200.0, 300.0, 400.0, 500.0, 600.0],
+        'Odometer': [1000, 1100, None, 'n/a', 1400, 'reset'],
+        'Serviced': [pd.Timestamp('2023-01-01'), pd.Timestamp('2023-01-02'), None, None, 'soon', None]
+    }).to_excel(path, index=False)
+
+    batched = read_workbook(path, batch_size=2)
+    whole = read_workbook(path)
+
+    assert batched['odometer'].tolist()[3:] == ['n/a', '1400', 'reset']
+    assert batched['serviced'].tolist()[4] == 'soon'
+    # Same result as when the mixed cells fall in the first batch
+    pd.testing.assert_frame_equal(batched, whole)
+    assert batched['price'].dtype == np.float64
+    assert not batched['parse_errors'].any()
+
+def test_known_column_failures_are_recorded_in_parse_errors(tmp_path):
+    path = tmp_path / 'Spend.xlsx'
+    pd.DataFrame({'Date': pd.date_range('2023-01-01', periods=4),
+                  'Price': [1.0, 2.0, 'abc', 4.0]}).to_excel(path, index=False)
+
+    df = read_workbook(path, batch_size=2)
+
+    assert np.isnan(df['price'][2])
+    assert df['parse_errors'].tolist() == [0, 0, 2, 0]
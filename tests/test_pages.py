@@ -0,0 +1,28 @@
+from streamlit.testing.v1 import AppTest
+
+def _performance_panel_app():
+    from pages import performance_panel
+
+    records = [
+        {'name': 'rerun', 'depth': -1, 'start_ms': 0.0, 'ms': 12.0},
+        {'name': 'filter', 'depth': 0, 'start_ms': 1.0, 'ms': 3.0}
+    ]
+    performance_panel(records)
+
+def test_warmup_status_is_empty_before_any_warmup():
+    from warmup import warmup_status
+
+    assert warmup_status() == {}
+
+def test_performance_panel_renders_with_warmup_off():
+    at = AppTest.from_function(_performance_panel_app).run()
+
+    assert not at.exception
+    assert not [caption for caption in at.caption if 'warm-up' in caption.value]
+
+def test_performance_panel_profiles_imports_on_request():
+    at = AppTest.from_function(_performance_panel_app, default_timeout=60).run()
+    at.checkbox(key='perf_imports').check().run()
+
+    assert not at.exception
+    assert [caption for caption in at.caption if caption.value.startswith('Cold start:')]
@@ -0,0 +1,9 @@
+from config import STARTUP_CONFIG
+from startup import eager_modules, profile_imports
+
+def test_cold_start_stays_within_budget_and_defers_heavy_modules():
+    wall, records = profile_imports()
+
+    assert records
+    assert eager_modules(records) == []
+    assert wall <= STARTUP_CONFIG['budget_seconds']
@@ -0,0 +1,180 @@
+"""
+Resampled daily, weekly and monthly series with rolling statistics.
+
+Transactions are bucketed by calendar period with np.bincount, keeping the
+raw per-period sums (spend, litres, visits, price sum and count) next to
+the derived series. Because those sums are additive, rows appended later
+can be folded in and the rolling mean, rolling volatility and EWMA
+recomputed only from the first period they touch: a rolling statistic at
+period i depends on periods i - window + 1 .. i, and the EWMA on the
+previous period's value.
+
+Every period between the first and last transaction is present; periods
+without fills have zero spend and a missing price.
+"""
+
+import numpy as np
+import pandas as pd
+from config import TIMESERIES_CONFIG
+from memo import memoize
+
+FREQUENCIES = ('daily', 'weekly', 'monthly')
+SUM_COLUMNS = ('visits', 'spend', 'litres', 'price_sum', 'price_count')
+STAT_COLUMNS = ('spend', 'price')
+
+def period_ordinals(dates, frequency):
+    """Integer period number of each datetime64 value (weeks start on Monday)."""
+    if frequency == 'daily':
+        return dates.astype('datetime64[D]').view(np.int64)
+    if frequency == 'weekly':
+        # Day 0 (1970-01-01) is a Thursday, so day -3 starts a week
+        return (dates.astype('datetime64[D]').view(np.int64) + 3) // 7
+    if frequency == 'monthly':
+        return dates.astype('datetime64[M]').view(np.int64)
+    raise ValueError(f"Unknown frequency: {frequency}")
+
+def period_starts(ordinals, frequency):
+    """First day of each period number, as datetime64[ns]."""
+    ordinals = np.asarray(ordinals, dtype=np.int64)
+    if frequency == 'daily':
+        starts = ordinals.astype('datetime64[D]')
+    elif frequency == 'weekly':
+        starts = (ordinals * 7 - 3).astype('datetime64[D]')
+    elif frequency == 'monthly':
+        starts = ordinals.astype('datetime64[M]').astype('datetime64[D]')
+    else:
+        raise ValueError(f"Unknown frequency: {frequency}")
+    return starts.astype('datetime64[ns]')
+
+def _bucket_sums(df, frequency):
+    """(first ordinal, {sum column: per-period array}) for the dated rows of df."""
+    dates = df['date'].to_numpy(dtype='datetime64[ns]')
+    dated = ~np.isnat(dates)
+    if not dated.any():
+        return None, {}
+
+    ordinals = period_ordinals(dates[dated], frequency)
+    first = int(ordinals.min())
+    codes = ordinals - first
+    length = int(codes.max()) + 1
+
+    def column_sum(column):
+        if column not in df.columns:
+            return np.zeros(length)
+        values = df[column].to_numpy(dtype=np.float64, na_value=np.nan)[dated]
+        present = ~np.isnan(values)
+        return np.bincount(codes[present], weights=values[present], minlength=length)
+
+    prices = df['liter_price'].to_numpy(dtype=np.float64, na_value=np.nan)[dated] if 'liter_price' in df.columns else None
+    sums = {
+        'visits': np.bincount(codes, minlength=length).astype(np.float64),
+        'spend': column_sum('price'),
+        'litres': column_sum('litres'),
+        'price_sum': column_sum('liter_price'),
+        'price_count': (np.bincount(codes[~np.isnan(prices)], minlength=length).astype(np.float64)
+                        if prices is not None else np.zeros(length))
+    }
+    return first, sums
+
+class RollingSeries:
+    """One frequency's resampled series and rolling statistics, extendable at the tail.
+
+    window is the rolling window and span the EWMA span, both in periods;
+    they default to TIMESERIES_CONFIG for the frequency.
+    """
+
+    def __init__(self, df, frequency='weekly', window=None, span=None):
+        if frequency not in FREQUENCIES:
+            raise ValueError(f"Unknown frequency: {frequency}")
+        self.frequency = frequency
+        self.window = window or TIMESERIES_CONFIG['windows'][frequency]
+        self.span = span or TIMESERIES_CONFIG['ewma_spans'][frequency]
+        self.first = None
+        self.sums = {column: np.zeros(0) for column in SUM_COLUMNS}
+        self.stats = {}
+        self.extend(df)
+
+    def __len__(self):
+        return len(self.sums['visits'])
+
+    def extend(self, rows):
+        """Fold rows into the sums and recompute statistics from the earliest period they touch."""
+        first, sums = _bucket_sums(rows, self.frequency)
+        if first is None:
+            if not self.stats:
+                self._recompute(0)
+            return self
+
+        if self.first is None:
+            self.first, self.sums = first, sums
+            self._recompute(0)
+            return self
+
+        length = len(self)
+        start = min(self.first, first)
+        end = max(self.first + length, first + len(sums['visits']))
+        old_offset, new_offset = self.first - start, first - start
+        for column in SUM_COLUMNS:
+            merged = np.zeros(end - start)
+            merged[old_offset:old_offset + length] = self.sums[column]
+            merged[new_offset:new_offset + len(sums[column])] += sums[column]
+            self.sums[column] = merged
+
+        self.first = start
+        # Periods before the rows' first one keep their values, but only if nothing was prepended
+        self._recompute(new_offset if old_offset == 0 else 0)
+        return self
+
+    def _recompute(self, changed):
+        """Recompute derived series and statistics for periods changed onwards."""
+        counts = self.sums['price_count']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            price = np.where(counts > 0, self.sums['price_sum'] / counts, np.nan)
+        values = {'spend': self.sums['spend'], 'price': price}
+
+        stats = {}
+        lead = max(changed - self.window + 1, 0)
+        for column in STAT_COLUMNS:
+            previous = {
+                name: self.stats.get(name, np.empty(0))[:changed]
+                for name in (f'{column}_rolling', f'{column}_volatility', f'{column}_ewma')
+            }
+            if any(len(prefix) < changed for prefix in previous.values()):
+                changed, lead = 0, 0
+                previous = {name: np.empty(0) for name in previous}
+
+            tail = pd.Series(values[column][lead:])
+            rolling = tail.rolling(self.window, min_periods=1)
+            stats[f'{column}_rolling'] = np.concatenate([previous[f'{column}_rolling'], rolling.mean().to_numpy()[changed - lead:]])
+            stats[f'{column}_volatility'] = np.concatenate([previous[f'{column}_volatility'], rolling.std().to_numpy()[changed - lead:]])
+
+            # Seeding with the last EWMA value continues the recursion exactly
+            seed = self.stats[f'{column}_ewma'][changed - 1] if changed else np.nan
+            ewma = pd.Series(np.concatenate([[seed], values[column][changed:]])).ewm(
+                span=self.span, adjust=False, ignore_na=True).mean().to_numpy()[1:]
+            stats[f'{column}_ewma'] = np.concatenate([previous[f'{column}_ewma'], ewma])
+
+        self.price = price
+        self.stats = stats
+
+    @property
+    def table(self):
+        """Frame indexed by period start with the sums, average price and statistics."""
+        ordinals = (self.first or 0) + np.arange(len(self))
+        index = pd.DatetimeIndex(period_starts(ordinals, self.frequency), name='period')
+        table = pd.DataFrame({
+            'visits': self.sums['visits'].astype(np.int64),
+            'spend': self.sums['spend'],
+            'litres': self.sums['litres'],
+            'price': self.price
+        }, index=index)
+        for name, series in self.stats.items():
+            table[name] = series
+        return table
+
+@memoize('analytics')
+def resample(df, frequency='weekly', window=None, span=None):
+    """Resampled series of df with rolling statistics, as RollingSeries.table."""
+    if 'date' not in df.columns:
+        return pd.DataFrame()
+    return RollingSeries(df, frequency, window, span).table
@@ -0,0 +1,71 @@
+"""
+Lightweight timing spans for dashboard reruns.
+
+app.main opens a rerun with start_rerun, wraps each stage in span(name)
+and closes it with finish_rerun, which returns the spans for the sidebar
+performance panel and appends them to the JSON-lines log when one is
+configured. Spans nest; each records its depth and its start offset within
+the rerun.
+
+Spans are kept per thread, since Streamlit runs every session's script in
+its own thread. When PERF_CONFIG['enabled'] is off, span returns one shared
+no-op context manager, so an instrumented stage costs a dict lookup.
+"""
+
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+from config import PERF_CONFIG
+
+_NO_SPAN = nullcontext()
+_state = threading.local()
+_log_lock = threading.Lock()
+
+def start_rerun():
+    """Begin collecting spans for this thread's rerun."""
+    if PERF_CONFIG['enabled']:
+        _state.records = []
+        _state.depth = 0
+        _state.start = time.perf_counter()
+
+def span(name):
+    """Context manager timing one stage of the current rerun."""
+    if not PERF_CONFIG['enabled'] or getattr(_state, 'records', None) is None:
+        return _NO_SPAN
+    return _span(name)
+
+@contextmanager
+def _span(name):
+    start = time.perf_counter()
+    record = {'name': name, 'depth': _state.depth, 'start_ms': 1000 * (start - _state.start), 'ms': None}
+    _state.records.append(record)
+    _state.depth += 1
+    try:
+        yield
+    finally:
+        _state.depth -= 1
+        record['ms'] = 1000 * (time.perf_counter() - start)
+
+def finish_rerun():
+    """Stop collecting and return this rerun's spans (empty when disabled), logging them if configured."""
+    records = getattr(_state, 'records', None)
+    if records is None:
+        return []
+    _state.records = None
+    total = {'name': 'rerun', 'depth': -1, 'start_ms': 0.0, 'ms': 1000 * (time.perf_counter() - _state.start)}
+    records = [total] + records
+
+    if PERF_CONFIG['log_file']:
+        write_log(records, PERF_CONFIG['log_file'])
+    return records
+
+def write_log(records, path):
+    """Append one JSON line per span, tagged with a rerun id and UTC timestamp."""
+    rerun = uuid.uuid4().hex[:12]
+    stamp = datetime.now(timezone.utc).isoformat(timespec='milliseconds')
+    lines = ''.join(json.dumps({'rerun': rerun, 'time': stamp, **record}) + '\n' for record in records)
+    with _log_lock, open(path, 'a', encoding='utf-8') as f:
+        f.write(lines)
@@ -0,0 +1,105 @@
+"""
+Rule-based validation of prepared transactions at ingest.
+
+prepare_data coerces dates and numbers, turning anything unparseable into
+NaT or NaN, and records which columns failed to parse in the small
+'parse_errors' bitmask so the information survives the snapshot. validate
+then evaluates every rule below as one vectorised mask over the whole
+frame. Rows failing any rule move to a quarantine frame that says which
+rules they broke, so KPIs are computed from clean rows only and no
+zero-litre row turns cost_per_litre into inf.
+"""
+
+import numpy as np
+import pandas as pd
+from config import VALIDATION_CONFIG
+
+# Bit set in 'parse_errors' when a raw value of the column could not be parsed
+PARSE_ERROR_BITS = {'date': 1, 'price': 2, 'litres': 4, 'liter_price': 8}
+NUMERIC_COLUMNS = ('price', 'litres', 'liter_price')
+DUPLICATE_KEY = ('date', 'station', 'price', 'litres', 'liter_price', 'vehicle')
+
+RULES = {
+    'bad_date': 'missing or unparseable date',
+    'not_numeric': 'non-numeric price, litres or price/L',
+    'missing_price': 'missing price',
+    'non_positive_litres': 'zero, negative or missing litres',
+    'out_of_range': 'value outside plausible range',
+    'duplicate': 'exact repeat of an earlier row'
+}
+
+def parse_error_bits(raw, parsed, column):
+    """parse_errors bits for the rows of column whose raw value was present but did not parse."""
+    failed = (parsed.isna() & raw.notna()).to_numpy()
+    return failed.astype(np.uint8) * np.uint8(PARSE_ERROR_BITS[column])
+
+def rule_masks(df, config=VALIDATION_CONFIG):
+    """One boolean array per applicable rule, True where the row breaks it."""
+    masks = {}
+    errors = df['parse_errors'].to_numpy() if 'parse_errors' in df.columns else np.zeros(len(df), dtype=np.uint8)
+
+    def values(column):
+        return df[column].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    if 'date' in df.columns:
+        masks['bad_date'] = df['date'].isna().to_numpy()
+    numeric_bits = sum(PARSE_ERROR_BITS[column] for column in NUMERIC_COLUMNS)
+    if (errors & numeric_bits).any():
+        masks['not_numeric'] = (errors & numeric_bits) != 0
+    if 'price' in df.columns:
+        masks['missing_price'] = np.isnan(values('price'))
+    if 'litres' in df.columns:
+        # NaN compares False, so missing litres count here too
+        masks['non_positive_litres'] = ~(values('litres') > 0)
+
+    out_of_range = np.zeros(len(df), dtype=bool)
+    for column, (low, high) in config['ranges'].items():
+        if column in df.columns:
+            column_values = values(column)
+            out_of_range |= (column_values < low) | (column_values > high)
+    masks['out_of_range'] = out_of_range
+
+    key = [column for column in DUPLICATE_KEY if column in df.columns]
+    if config['drop_duplicates'] and key:
+        masks['duplicate'] = df.duplicated(subset=key, keep='first').to_numpy()
+    return masks
+
+def validate(df, config=VALIDATION_CONFIG):
+    """Split prepared rows into (clean, quarantine).
+
+    clean keeps the passing rows with a fresh RangeIndex and without the
+    parse_errors column. quarantine holds the failing rows, led by a 'row'
+    column with each row's position in df, then one boolean column per rule
+    and a 'reasons' column naming the rules broken. Loaders validate rows in
+    the order they were read, so 'row' counts data rows from the top of the
+    source (0 is the first row under the header).
+    """
+    if not config['enabled']:
+        return df.drop(columns='parse_errors', errors='ignore'), pd.DataFrame()
+
+    masks = rule_masks(df, config)
+    rejected = np.zeros(len(df), dtype=bool)
+    for mask in masks.values():
+        rejected |= mask
+
+    if not rejected.any():
+        return df.drop(columns='parse_errors', errors='ignore'), pd.DataFrame()
+
+    clean = df[~rejected].drop(columns='parse_errors', errors='ignore').reset_index(drop=True)
+    quarantine = df[rejected].drop(columns='parse_errors', errors='ignore').reset_index(drop=True)
+    quarantine.insert(0, 'row', np.flatnonzero(rejected))
+    flags = pd.DataFrame({rule: mask[rejected] for rule, mask in masks.items()})
+    quarantine = pd.concat([quarantine, flags], axis=1)
+    quarantine['reasons'] = flags.dot(pd.Index([RULES[rule] + '; ' for rule in flags.columns])).str.rstrip('; ')
+    return clean, quarantine
+
+def rejection_report(quarantine, total_rows):
+    """Rows rejected per rule (a row can break several), with the share of all rows."""
+    rules = [rule for rule in RULES if rule in quarantine.columns]
+    counts = quarantine[rules].sum().astype(np.int64) if rules else pd.Series(dtype=np.int64)
+    report = pd.DataFrame({
+        'rule': [RULES[rule] for rule in counts.index],
+        'rows': counts.to_numpy(),
+        'pct': counts.to_numpy() / max(total_rows, 1) * 100
+    }, index=pd.Index(counts.index, name='code'))
+    return report[report['rows'] > 0]
@@ -0,0 +1,138 @@
+"""
+Background warm-up of the analytics and figure caches (optional; see
+WARMUP_CONFIG, off unless PETROL_WARMUP=1).
+
+The first session to pick a filter combination pays for filtering, KPIs,
+insights, forecasts and figure building. Once a dataset is loaded,
+start_warmup queues its likely selections (the sidebar's default year,
+the latest months of that year, the recent-day ranges, then every other
+year) on a small thread pool. Each selection is filtered and run through
+the same memoized functions the pages call, with the same arguments, so
+the results are waiting in the 'analytics' and 'figures' caches.
+
+Threads rather than processes, because the caches live in this process;
+NumPy and pandas release the GIL in their inner loops. Nothing here blocks
+a rerun: start_warmup only submits work, and queued selections for a
+dataset are dropped as soon as another one is loaded.
+"""
+
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+import pandas as pd
+from config import FILTER_CONFIG, TIMESERIES_CONFIG, WARMUP_CONFIG
+from analytics import (calculate_kpis, date_extent, filter_data, filter_values, generate_predictions,
+                       get_insights, group_forecasts)
+from anomalies import score_transactions
+from datasets import is_full_frame
+
+_executor = None
+_lock = threading.Lock()
+_generation = itertools.count(1)
+_current = None
+_status = {}
+
+def likely_selections(df, latest_months=WARMUP_CONFIG['latest_months']):
+    """filter_data argument tuples (year, month, station, vehicle, date_range), most likely first."""
+    years = filter_values(df, 'year')[::-1] if 'year' in df.columns else []
+    selections = []
+    if years:
+        # The sidebar opens on the latest year with all months
+        selections.append((years[0], 'All Months', None, None, None))
+        if 'month_name' in df.columns and latest_months:
+            months = filter_values(df, 'month_name', years[0])[-latest_months:][::-1]
+            selections += [(years[0], month, None, None, None) for month in months]
+
+    if 'date' in df.columns:
+        _, last = date_extent(df)
+        if pd.notna(last):
+            selections += [(None, 'All Months', None, None, (last - timedelta(days=days - 1), last))
+                           for days in FILTER_CONFIG['recent_days']]
+
+    selections += [(year, 'All Months', None, None, None) for year in years[1:]]
+    return selections[:WARMUP_CONFIG['max_selections']]
+
+def warm_selection(df, selection, config=WARMUP_CONFIG):
+    """Compute and cache everything the pages show for one selection; returns its filtered view."""
+    view = filter_data(df, *selection)
+    if view.empty:
+        return view
+
+    calculate_kpis(view)
+    get_insights(view)
+    generate_predictions(view)
+    if config['group_forecasts']:
+        by = next((column for column in ('station', 'vehicle') if column in view.columns), None)
+        if by:
+            group_forecasts(view, by)
+
+    if config['figures']:
+        # Plotly stays out of cold start; by now the first rerun has rendered
+        from charts import (create_spending_trend_chart, create_station_comparison_chart,
+                            create_price_analysis_chart, create_consumption_chart, create_monthly_summary_chart)
+
+        frequency = TIMESERIES_CONFIG['chart_frequency']
+        create_spending_trend_chart(view, frequency)
+        create_station_comparison_chart(view)
+        create_price_analysis_chart(view, frequency)
+        create_consumption_chart(view)
+        create_monthly_summary_chart(view)
+    return view
+
+def _run(generation, warm, *args):
+    if _current != generation:
+        return
+    start = time.perf_counter()
+    error = None
+    try:
+        warm(*args)
+    except Exception as e:
+        # Whatever cannot be warmed simply stays cold
+        error = f"{warm.__name__}{args[1:]}: {type(e).__name__}: {e}"
+    with _lock:
+        if _current == generation:
+            _status['done'] += 1
+            _status['seconds'] += time.perf_counter() - start
+            if error:
+                _status['errors'].append(error)
+
+def start_warmup(df, config=WARMUP_CONFIG):
+    """Queue the likely selections of a registered frame for warming; returns their futures.
+
+    Frames that are not registered datasets (and SQLite stores, whose small
+    row cache warming would churn) are left alone, as is everything when
+    config['enabled'] is off.
+    """
+    global _executor, _current
+    if not config['enabled'] or not isinstance(df, pd.DataFrame) or df.empty or is_full_frame(df) is None:
+        return []
+
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=config['workers'], thread_name_prefix='warmup')
+        _current = generation = next(_generation)
+        tasks = [(warm_selection, df, selection) for selection in likely_selections(df)]
+        if 'date' in df.columns:
+            # Anomalies are scored once against the full history
+            tasks.append((score_transactions, df))
+        _status.clear()
+        _status.update(queued=len(tasks), done=0, seconds=0.0, errors=[])
+        return [_executor.submit(_run, generation, *task) for task in tasks]
+
+def stop_warmup():
+    """Drop the queued tasks; the one in progress finishes."""
+    global _current
+    with _lock:
+        _current = None
+
+def warmup_status():
+    """Progress of the latest warm-up: tasks queued and done, seconds spent and errors.
+
+    Empty until a warm-up has been started.
+    """
+    with _lock:
+        if not _status:
+            return {}
+        return dict(_status, errors=list(_status['errors']))